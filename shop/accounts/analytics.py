@@ -0,0 +1,125 @@
+# accounts/analytics.py
+# Owner analytics: GROUP BY totals over the monthly ledger rollups.
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+
+from .models import LedgerRollup
+
+WINDOWS = (
+    ("1m", "This month"),
+    ("3m", "Last 3 months"),
+    ("12m", "Last 12 months"),
+    ("ytd", "This year"),
+    ("all", "All time"),
+)
+DEFAULT_WINDOW = "12m"
+
+
+def _shift_month(month, delta):
+    idx = month.year * 12 + month.month - 1 + delta
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def _parse_month(value):
+    try:
+        year, month = str(value).split("-", 1)
+        return date(int(year), int(month), 1)
+    except (TypeError, ValueError):
+        raise ValueError("Months look like YYYY-MM")
+
+
+def month_window(params, today):
+    """Return (window, first_month, last_month) from ?window= or ?from=/&to= (YYYY-MM).
+
+    Either bound may be None for an open end. Windows are whole months because
+    the totals come from the monthly rollups, not from the ledger tables.
+    """
+    this_month = today.replace(day=1)
+    if params.get("from") or params.get("to"):
+        start = _parse_month(params["from"]) if params.get("from") else None
+        end = _parse_month(params["to"]) if params.get("to") else None
+        if start and end and start > end:
+            raise ValueError("'from' is after 'to'")
+        return "custom", start, end
+
+    window = params.get("window") or DEFAULT_WINDOW
+    if window == "1m":
+        return window, this_month, this_month
+    if window == "3m":
+        return window, _shift_month(this_month, -2), this_month
+    if window == "12m":
+        return window, _shift_month(this_month, -11), this_month
+    if window == "ytd":
+        return window, date(today.year, 1, 1), this_month
+    if window == "all":
+        return window, None, None
+    raise ValueError("Unknown window")
+
+
+def _rollups(first_month, last_month, user_id=None):
+    qs = LedgerRollup.objects.all()
+    if user_id is not None:
+        qs = qs.filter(user_id=user_id)
+    if first_month:
+        qs = qs.filter(month__gte=first_month)
+    if last_month:
+        qs = qs.filter(month__lte=last_month)
+    return qs
+
+
+def _grouped(qs, field):
+    """{key: {"income": Decimal, "expense": Decimal, "count": int}} for one GROUP BY field."""
+    out = {}
+    for r in qs.values(field, "type").annotate(total=Sum("total"), n=Sum("count")).order_by():
+        if not r["n"]:
+            continue
+        row = out.setdefault(r[field], {"income": Decimal(0), "expense": Decimal(0), "count": 0})
+        row[r["type"]] += r["total"] or 0
+        row["count"] += r["n"]
+    return out
+
+
+def _rows(grouped, key_name, order_key):
+    rows = []
+    for key, v in grouped.items():
+        rows.append({key_name: key, "income": v["income"], "expense": v["expense"],
+                     "net": v["income"] - v["expense"], "count": v["count"]})
+    rows.sort(key=order_key)
+    return rows
+
+
+def ledger_summary(first_month, last_month, user_id=None):
+    """Per-month and per-mode totals (plus per-staff when user_id is None).
+
+    One GROUP BY query per breakdown over the rollups, and one more for the
+    usernames, so the cost follows the number of users/months/modes rather
+    than the number of ledger rows.
+    """
+    qs = _rollups(first_month, last_month, user_id)
+    by_month = _rows(_grouped(qs, "month"), "month", lambda r: r["month"])
+    by_mode = _rows(_grouped(qs, "mode"), "mode", lambda r: -(r["income"] + r["expense"]))
+    totals = {
+        "income": sum((r["income"] for r in by_month), Decimal(0)),
+        "expense": sum((r["expense"] for r in by_month), Decimal(0)),
+        "count": sum(r["count"] for r in by_month),
+    }
+    totals["net"] = totals["income"] - totals["expense"]
+    summary = {"by_month": by_month, "by_mode": by_mode, "totals": totals}
+
+    if user_id is None:
+        by_staff = _rows(_grouped(qs, "user_id"), "user_id", lambda r: -(r["income"] + r["expense"]))
+        names = dict(User.objects.filter(id__in=[r["user_id"] for r in by_staff])
+                     .values_list("id", "username"))
+        for r in by_staff:
+            r["username"] = names.get(r["user_id"], f"#{r['user_id']}")
+        summary["by_staff"] = by_staff
+    return summary
+
+
+def window_dates(first_month, last_month):
+    """Turn a month window into inclusive (date_from, date_to) bounds for ledger queries."""
+    date_to = _shift_month(last_month, 1) - timedelta(days=1) if last_month else None
+    return first_month, date_to
@@ -14,3 +14,5 @@ class AccountsConfig(AppConfig):
 
     def ready(self):
         import accounts.signals
+        from accounts.middleware import install
+        install()
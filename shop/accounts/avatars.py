@@ -0,0 +1,110 @@
+# accounts/avatars.py
+# Small square avatar thumbnails (WebP + JPEG), built after an upload instead of during it.
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+
+from .models import Profile
+
+THUMB_SIZE = 96  # px; base.html shows avatars at 42px, so this covers 2x screens
+THUMB_DIR = "avatars/thumbs/"
+# file extension -> (Pillow format, save options, content type)
+THUMB_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 6}, "image/webp"),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}, "image/jpeg"),
+}
+CACHE_FOREVER = "public, max-age=31536000, immutable"
+
+_pool = None
+
+
+def render_thumbnails(fileobj):
+    """Crop an uploaded image to a THUMB_SIZE square; returns {ext: encoded bytes}."""
+    from PIL import Image, ImageOps
+
+    with Image.open(fileobj) as img:
+        img = ImageOps.exif_transpose(img)
+        img = ImageOps.fit(img.convert("RGBA"), (THUMB_SIZE, THUMB_SIZE), Image.LANCZOS)
+    # JPEG has no alpha: flatten transparent PNG/GIF avatars onto white
+    flat = Image.new("RGB", img.size, "white")
+    flat.paste(img, mask=img.getchannel("A"))
+    out = {}
+    for ext, (fmt, options, _) in THUMB_FORMATS.items():
+        buf = io.BytesIO()
+        (img if fmt == "WEBP" else flat).save(buf, fmt, **options)
+        out[ext] = buf.getvalue()
+    return out
+
+
+def thumb_name(data, ext):
+    # content-hashed: a new avatar gets a new URL, so old ones can be cached forever
+    return f"{THUMB_DIR}{hashlib.sha256(data).hexdigest()[:20]}.{ext}"
+
+
+def build_thumbnails(profile):
+    """Write the thumbnails of profile.avatar and record them; returns the new avatar_thumbs."""
+    source = profile.avatar.name
+    try:
+        with profile.avatar.open("rb") as f:
+            rendered = render_thumbnails(f)
+    except Exception as exc:  # unreadable upload: remember it so a backfill does not retry it forever
+        thumbs = {"source": source, "error": str(exc)[:200]}
+    else:
+        thumbs = {"source": source}
+        for ext, data in rendered.items():
+            name = thumb_name(data, ext)
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(data))
+            thumbs[ext] = name
+    # only if the avatar was not replaced meanwhile; the newer upload has its own build
+    updated = Profile.objects.filter(pk=profile.pk, avatar=source).update(avatar_thumbs=thumbs)
+    if updated:
+        old = profile.avatar_thumbs or {}
+        for ext in THUMB_FORMATS:
+            if old.get(ext) and old[ext] != thumbs.get(ext) and \
+                    not Profile.objects.filter(**{f"avatar_thumbs__{ext}": old[ext]}).exists():
+                default_storage.delete(old[ext])
+        profile.avatar_thumbs = thumbs
+    return thumbs
+
+
+def pending_profiles():
+    """Profiles whose avatar has no thumbnails yet (or thumbnails of an older upload)."""
+    built = Q(avatar_thumbs__has_key="source") & Q(avatar_thumbs__source=F("avatar"))
+    return Profile.objects.exclude(Q(avatar="") | Q(avatar__isnull=True)).exclude(built)
+
+
+def build_pending_thumbnails(batch_size=20):
+    """Build every missing set, e.g. for uploads whose background build was lost in a restart.
+
+    Returns how many profiles were built. Failed renders are recorded too, so the loop ends.
+    """
+    built = 0
+    while batch := list(pending_profiles()[:batch_size]):
+        for profile in batch:
+            build_thumbnails(profile)
+        built += len(batch)
+    return built
+
+
+def _build_later(profile_id):
+    close_old_connections()
+    try:
+        profile = Profile.objects.filter(pk=profile_id).first()
+        if profile and profile.avatar:
+            build_thumbnails(profile)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(profile):
+    """Build the profile's thumbnails on a background thread once the upload is committed."""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="avatar-thumbs")
+    transaction.on_commit(lambda: _pool.submit(_build_later, profile.pk))
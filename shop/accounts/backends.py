@@ -0,0 +1,23 @@
+# accounts/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileBackend(ModelBackend):
+    """ModelBackend that loads the session user together with its profile.
+
+    AuthenticationMiddleware resolves request.user through get_user(), so the
+    context processor and views can read request.user.profile without a
+    second query.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        user = UserModel._default_manager.select_related("profile").filter(pk=user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # request.auser() in async views goes through here, not get_user()
+        UserModel = get_user_model()
+        user = await UserModel._default_manager.select_related("profile").filter(pk=user_id).afirst()
+        return user if user is not None and self.user_can_authenticate(user) else None
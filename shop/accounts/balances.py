@@ -0,0 +1,153 @@
+# accounts/balances.py
+# Per-account (payment mode) running balances, started from month-end snapshots.
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Max, Q, Sum, When
+
+from expenses.models import Expense
+from income.models import Income, MODE_CHOICES
+
+from .models import BalanceSnapshot, LedgerRollup
+
+CENT = Decimal("0.01")
+
+
+def account_modes():
+    """(key, label) for every mode either ledger accepts, income's order first."""
+    seen = dict(MODE_CHOICES)
+    for key, label in Expense.MODE_CHOICES:
+        seen.setdefault(key, label)
+    return list(seen.items())
+
+
+def _money(value):
+    # SQLite sums DECIMAL columns as floats
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def _snapshots(user):
+    return BalanceSnapshot.objects.filter(user__isnull=True) if user is None else \
+        BalanceSnapshot.objects.filter(user=user)
+
+
+def _month_end(month_start):
+    return (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _scope_sql(user, column="user_id"):
+    if user is None:
+        return "1=1", []
+    return f"{column} = %s", [user.id]
+
+
+def _daily_sql(user, start, date_to, modes):
+    """UNION ALL of the snapshot rows at `start` and the income/expense rows after it,
+    summed per (mode, day), with a running SUM() OVER each mode."""
+    branches, params = [], []
+    mode_sql = f" AND mode IN ({', '.join(['%s'] * len(modes))})" if modes else ""
+
+    if start is not None:
+        scope = "user_id IS NULL" if user is None else "user_id = %s"
+        branches.append(f"SELECT mode, date, balance AS amount FROM {BalanceSnapshot._meta.db_table} "
+                        f"WHERE {scope} AND date = %s{mode_sql}")
+        params += ([] if user is None else [user.id]) + [start] + list(modes)
+
+    for model, sign in ((Income, ""), (Expense, "-")):
+        scope, scope_params = _scope_sql(user)
+        lower = " AND date > %s" if start is not None else ""
+        branches.append(f"SELECT mode, date, {sign}amount AS amount FROM {model._meta.db_table} "
+                        f"WHERE {scope}{lower} AND date <= %s{mode_sql}")
+        params += scope_params + ([start] if start is not None else []) + [date_to] + list(modes)
+
+    sql = (
+        "WITH moves AS (" + " UNION ALL ".join(branches) + "), "
+        "daily AS (SELECT mode, date, SUM(amount) AS net FROM moves GROUP BY mode, date) "
+        "SELECT mode, date, net, "
+        "SUM(net) OVER (PARTITION BY mode ORDER BY date ROWS UNBOUNDED PRECEDING) AS balance "
+        "FROM daily ORDER BY date, mode"
+    )
+    return sql, params
+
+
+def running_balances(user, date_from, date_to, modes=None):
+    """Daily running balance per account between date_from and date_to (inclusive).
+
+    user=None means the whole shop. The scan starts at the latest month-end
+    snapshot before date_from (or the beginning of the ledger without one),
+    so a range costs at most a month of rows before it. Returns
+    {"opening": {mode: Decimal}, "closing": {mode: Decimal},
+     "days": [{"date", "mode", "net", "balance"}]}.
+    """
+    start = _snapshots(user).filter(date__lt=date_from).aggregate(d=Max("date"))["d"]
+    sql, params = _daily_sql(user, start, date_to, modes or [])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    opening, closing, days = {}, {}, []
+    for mode, day, net, balance in rows:
+        day = date.fromisoformat(day) if isinstance(day, str) else day
+        balance = _money(balance)
+        closing[mode] = balance
+        if day < date_from:
+            opening[mode] = balance
+        else:
+            days.append({"date": day, "mode": mode, "net": _money(net), "balance": balance})
+    return {"opening": opening, "closing": closing, "days": days}
+
+
+# ---------- snapshots ----------
+def invalidate_snapshots(user_id, row_date):
+    """A write dated `row_date` changes every later balance of that user and of the shop."""
+    BalanceSnapshot.objects.filter(Q(user_id=user_id) | Q(user__isnull=True), date__gte=row_date).delete()
+
+
+def _monthly_nets(user_id=None):
+    # income minus expense per (mode, month), from the rollups rather than the raw rows
+    qs = LedgerRollup.objects.all() if user_id is None else LedgerRollup.objects.filter(user_id=user_id)
+    signed = Case(When(type="expense", then=-F("total")), default=F("total"),
+                  output_field=DecimalField(max_digits=14, decimal_places=2))
+    return qs.values("month", "mode").annotate(net=Sum(signed)).order_by("month")
+
+
+def _snapshot_scope(user_id, until):
+    latest = BalanceSnapshot.objects.filter(
+        **({"user__isnull": True} if user_id is None else {"user_id": user_id})
+    ).aggregate(d=Max("date"))["d"]
+    nets = {}
+    for r in _monthly_nets(user_id):
+        if r["month"] <= until:
+            nets.setdefault(r["month"], {})[r["mode"]] = _money(r["net"])
+    if not nets:
+        return []
+    objs, balances = [], {}
+    month = min(nets)
+    while month <= until:
+        for mode, net in nets.get(month, {}).items():
+            balances[mode] = balances.get(mode, Decimal(0)) + net
+        month_end = _month_end(month)
+        if latest is None or month_end > latest:
+            objs += [BalanceSnapshot(user_id=user_id, mode=mode, date=month_end, balance=balance)
+                     for mode, balance in balances.items()]
+        month = month_end + timedelta(days=1)
+    return objs
+
+
+def take_snapshots(today=None):
+    """Write the missing month-end snapshots for every closed month, per user and shop-wide.
+
+    Runs in one (IMMEDIATE, on SQLite) transaction so no ledger write can land
+    between reading the rollups and storing the balances. Returns rows created.
+    """
+    today = today or date.today()
+    last_closed = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+    created = 0
+    with transaction.atomic():
+        user_ids = list(LedgerRollup.objects.values_list("user_id", flat=True).distinct().order_by())
+        for user_id in user_ids + [None]:
+            objs = _snapshot_scope(user_id, last_closed)
+            BalanceSnapshot.objects.bulk_create(objs, batch_size=1000)
+            created += len(objs)
+    return created
@@ -0,0 +1,144 @@
+# accounts/batch.py
+# Validate-then-apply batches of add/update/delete operations on a ledger model.
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .closing import check_open
+from .ledger_cache import bump_ledger_version
+from .rollups import add_rows
+
+MAX_BATCH_SIZE = 500
+LEDGER_FIELDS = ("date", "description", "mode", "amount")
+
+
+def _clean_fields(op, allowed_modes, partial):
+    """Return the validated field values of one operation; raises ValueError."""
+    cleaned = {}
+    for field in LEDGER_FIELDS:
+        if field not in op or op[field] in (None, ""):
+            if not partial:
+                raise ValueError(f"Missing {field}")
+            continue
+        value = op[field]
+        if field == "date":
+            value = parse_date(str(value))
+            if not value:
+                raise ValueError("Invalid date")
+        elif field == "description":
+            value = str(value).strip()
+            if not value:
+                raise ValueError("Missing description")
+        elif field == "mode":
+            if value not in allowed_modes:
+                raise ValueError("Invalid mode")
+        elif field == "amount":
+            try:
+                value = Decimal(str(value))
+            except InvalidOperation:
+                raise ValueError("Invalid amount")
+            if not value.is_finite():
+                raise ValueError("Invalid amount")
+        cleaned[field] = value
+    return cleaned
+
+
+def apply_ledger_batch(model, type_, user, operations, allowed_modes):
+    """Apply a list of {"op": "add"|"update"|"delete", ...} dicts for `user`.
+
+    Everything is validated first; if any item fails nothing is written and
+    (False, results) comes back with a message per failing item. Otherwise
+    inserts go through bulk_create, updates through bulk_update and deletes
+    through one filtered delete, all inside a single transaction.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("operations must be a non-empty list")
+    if len(operations) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} operations per batch")
+
+    ids = set()
+    for op in operations:
+        if isinstance(op, dict) and op.get("op") in ("update", "delete"):
+            try:
+                ids.add(int(op.get("id")))
+            except (TypeError, ValueError):
+                pass
+    existing = model.objects.filter(user=user, id__in=ids).in_bulk()
+
+    results, ok = [], True
+    creates, updates, delete_ids, touched = [], {}, set(), set()
+    for index, op in enumerate(operations):
+        result = {"index": index, "op": op.get("op") if isinstance(op, dict) else None}
+        try:
+            if not isinstance(op, dict):
+                raise ValueError("Operation must be an object")
+            kind = op.get("op")
+            if kind == "add":
+                fields = _clean_fields(op, allowed_modes, partial=False)
+                check_open(fields["date"])
+                creates.append((index, model(user=user, **fields)))
+            elif kind in ("update", "delete"):
+                try:
+                    pk = int(op.get("id"))
+                except (TypeError, ValueError):
+                    raise ValueError("Missing id")
+                if pk not in existing:
+                    raise ValueError("Not found")
+                if pk in touched:
+                    raise ValueError("Duplicate id in batch")
+                touched.add(pk)
+                result["id"] = pk
+                if kind == "update":
+                    updates[pk] = _clean_fields(op, allowed_modes, partial=True)
+                    check_open(existing[pk].date, updates[pk].get("date"))
+                else:
+                    check_open(existing[pk].date)
+                    delete_ids.add(pk)
+            else:
+                raise ValueError("Unknown op")
+            result["status"] = "success"
+        except ValueError as exc:
+            ok = False
+            result.update(status="error", message=str(exc))
+        results.append(result)
+    if not ok:
+        return False, results
+
+    rollup_rows = []
+    with transaction.atomic():
+        if creates:
+            created = model.objects.bulk_create([obj for _, obj in creates])
+            for (index, _), obj in zip(creates, created):
+                results[index]["id"] = obj.id
+                rollup_rows.append((user.id, obj.date, obj.mode, obj.amount, 1))
+
+        if updates:
+            changed_fields = set()
+            objs = []
+            for pk, fields in updates.items():
+                obj = existing[pk]
+                rollup_rows.append((user.id, obj.date, obj.mode, -obj.amount, -1))
+                for name, value in fields.items():
+                    setattr(obj, name, value)
+                changed_fields.update(fields)
+                rollup_rows.append((user.id, obj.date, obj.mode, obj.amount, 1))
+                objs.append(obj)
+            if hasattr(model, "updated_at"):
+                # bulk_update skips auto_now
+                stamp = timezone.now()
+                for obj in objs:
+                    obj.updated_at = stamp
+                changed_fields.add("updated_at")
+            if changed_fields:
+                model.objects.bulk_update(objs, sorted(changed_fields), batch_size=200)
+
+        if delete_ids:
+            # post_delete receivers keep the rollups in step for these rows
+            model.objects.filter(user=user, id__in=delete_ids).delete()
+
+        add_rows(type_, rollup_rows)
+        # a description-only edit nets to zero in the rollups but still changes what lists show
+        bump_ledger_version(user.id)
+    return True, results
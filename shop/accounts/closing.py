@@ -0,0 +1,134 @@
+# accounts/closing.py
+# Month-end closing: frozen per-month totals, and what happens to later edits of closed months.
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateField, Max, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ClosedPeriod, LedgerRollup, PeriodAdjustment, PeriodTotal
+
+POLICIES = ("adjust", "block")
+
+
+class ClosedPeriodError(ValueError):
+    """A write touches a closed month while CLOSED_PERIOD_POLICY is "block"."""
+
+
+def policy():
+    value = getattr(settings, "CLOSED_PERIOD_POLICY", "adjust")
+    return value if value in POLICIES else "adjust"
+
+
+def closed_through():
+    """First day of the latest closed month, or None."""
+    return ClosedPeriod.objects.aggregate(m=Max("month"))["m"]
+
+
+def is_closed(row_date):
+    # months are closed oldest first, so everything up to the latest close is closed
+    return ClosedPeriod.objects.filter(month__gte=row_date.replace(day=1)).exists()
+
+
+def check_open(*dates):
+    """Raise ClosedPeriodError if blocking is on and any of `dates` is in a closed month."""
+    if policy() != "block":
+        return
+    dates = [d for d in dates if d]
+    if dates and is_closed(min(dates)):
+        raise ClosedPeriodError(f"{min(dates):%B %Y} is closed")
+
+
+def record_adjustment(user_id, type_, month, mode, amount, count):
+    """Book a delta to a closed month (called by apply_delta); returns True if it was closed."""
+    if not is_closed(month):
+        return False
+    PeriodAdjustment.objects.create(user_id=user_id, month=month, type=type_, mode=mode,
+                                    amount=amount, count=count)
+    return True
+
+
+def close_months(through):
+    """Close every open month up to and including `through`'s month, oldest first.
+
+    Each month's rollups are copied into PeriodTotal per user (shop-wide figures
+    are summed from those rows, so they drop a deleted user's months). The
+    whole run is one (IMMEDIATE, on SQLite) transaction, so no ledger write can
+    land between copying a month and marking it closed. Returns the months closed.
+    """
+    through = through.replace(day=1)
+    closed = []
+    with transaction.atomic():
+        last = closed_through()
+        if last and through <= last:
+            return closed
+        pending = LedgerRollup.objects.filter(month__lte=through)
+        if last:
+            pending = pending.filter(month__gt=last)
+        months = sorted(set(pending.values_list("month", flat=True).distinct().order_by()))
+        for month in months:
+            rollups = LedgerRollup.objects.filter(month=month)
+            PeriodTotal.objects.bulk_create(
+                [PeriodTotal(user_id=r.user_id, month=month, type=r.type, mode=r.mode,
+                             total=r.total, count=r.count)
+                 for r in rollups if r.count or r.total],
+                batch_size=1000,
+            )
+            ClosedPeriod.objects.create(month=month)
+            closed.append(month)
+        # quiet months need no totals, but the close still has to reach `through`
+        if not months or months[-1] < through:
+            if not ClosedPeriod.objects.filter(month=through).exists():
+                ClosedPeriod.objects.create(month=through)
+                closed.append(through)
+    return closed
+
+
+def last_closed_month(today=None):
+    """The month before today's: what a scheduled close should close through."""
+    today = today or date.today()
+    return (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+
+def ledger_totals(user_id=None):
+    """All-time (type, mode) totals: frozen months + their adjustments + the open rollups.
+
+    One UNION ALL query (the closed-through month is a subquery). Rows are
+    {"type", "mode", "sum_total", "sum_count"} and a (type, mode) pair may come
+    back up to three times; merge_totals() folds them.
+    """
+    closed_through = Coalesce(
+        Subquery(ClosedPeriod.objects.order_by("-month").values("month")[:1]),
+        Value(date.min, output_field=DateField()),
+        output_field=DateField(),
+    )
+    if user_id is None:
+        # per-user rows cascade with their user, so the shop total stays right after User.delete()
+        frozen = PeriodTotal.objects.filter(user__isnull=False)
+        adjustments = PeriodAdjustment.objects.all()
+        open_rollups = LedgerRollup.objects.all()
+    else:
+        frozen = PeriodTotal.objects.filter(user_id=user_id)
+        adjustments = PeriodAdjustment.objects.filter(user_id=user_id)
+        open_rollups = LedgerRollup.objects.filter(user_id=user_id)
+    parts = [
+        frozen.values("type", "mode").annotate(sum_total=Sum("total"), sum_count=Sum("count")),
+        adjustments.values("type", "mode").annotate(sum_total=Sum("amount"), sum_count=Sum("count")),
+        open_rollups.filter(month__gt=closed_through).values("type", "mode")
+        .annotate(sum_total=Sum("total"), sum_count=Sum("count")),
+    ]
+    parts = [qs.order_by() for qs in parts]
+    return parts[0].union(*parts[1:], all=True)
+
+
+def merge_totals(rows):
+    """Fold ledger_totals() rows into one {"type", "mode", "total", "count"} per pair, largest first."""
+    merged = {}
+    for r in rows:
+        row = merged.setdefault((r["type"], r["mode"]),
+                                {"type": r["type"], "mode": r["mode"], "total": Decimal(0), "count": 0})
+        row["total"] += Decimal(str(r["sum_total"] or 0))
+        row["count"] += r["sum_count"] or 0
+    return sorted(merged.values(), key=lambda r: -r["total"])
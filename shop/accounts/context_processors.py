@@ -1,11 +1,8 @@
 # accounts/context_processors.py
-from .models import Profile
 
 def user_profile(request):
+    # request.user comes from ProfileBackend with the profile already joined
     prof = None
     if request.user.is_authenticated:
-        try:
-            prof = request.user.profile
-        except Profile.DoesNotExist:
-            prof = None
+        prof = getattr(request.user, "profile", None)
     return {"profile": prof}
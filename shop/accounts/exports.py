@@ -0,0 +1,129 @@
+# accounts/exports.py
+# Constant-memory ledger exports shared by the income and expense apps.
+import csv
+from decimal import Decimal
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+LEDGER_HEADERS = ["Date", "Description", "Mode", "Amount (₹)"]
+EXPORT_CHUNK_SIZE = 2000
+# keep small exports in RAM, spill big ones to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_values(qs):
+    return qs.values_list("date", "description", "mode", "amount")
+
+
+def _csv_rows(qs, with_total):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(["date", "description", "mode", "amount"])
+    total = Decimal("0")
+    rows = csv_values(qs).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for d, description, mode, amount in rows:
+        total += amount
+        yield writer.writerow([d.isoformat(), description, mode, amount])
+    if with_total:
+        yield writer.writerow(["", "", "Total", total])
+
+
+async def _acsv_rows(qs, with_total):
+    # _csv_rows for ASGI, advanced EXPORT_CHUNK_SIZE lines at a time in a worker thread.
+    # (values_list().aiterator() runs its query on the event loop in Django 5.2)
+    lines = _csv_rows(qs, with_total)
+    next_chunk = sync_to_async(lambda: "".join(islice(lines, EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        yield chunk
+
+
+def ledger_csv_response(qs, filename, with_total=False, asynchronous=False):
+    """Stream qs as CSV; the first bytes go out before the query is exhausted.
+
+    Pass asynchronous=True under ASGI: Django reads a sync iterator there into
+    memory before sending it, an async one is streamed.
+    """
+    rows = (_acsv_rows if asynchronous else _csv_rows)(qs, with_total)
+    response = StreamingHttpResponse(rows, content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+PDF_CHUNK_ROWS = 500
+
+
+def ledger_pdf_tables(rows, headers, col_widths, on_chunk=None):
+    """Platypus Tables for text rows whose last column is the amount, plus a bold Total row.
+
+    The rows are split into PDF_CHUNK_ROWS-row pieces so platypus never has to
+    re-split one huge Table page after page. on_chunk(rows_so_far) is called
+    after each piece. Returns (tables, total).
+    """
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    tables = []
+    amount_col = len(headers) - 1
+
+    def add_table(data, first=False, last=False):
+        body_start = 1 if first else 0
+        body_end = -2 if last else -1
+        style = [
+            ("ALIGN", (amount_col, body_start), (amount_col, -1), "RIGHT"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("ROWBACKGROUNDS", (0, body_start), (-1, body_end), [colors.whitesmoke, colors.beige]),
+        ]
+        if first:
+            style += [
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ]
+        if last:
+            style.append(("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"))
+        table = Table(data, colWidths=col_widths)
+        table.setStyle(TableStyle(style))
+        tables.append(table)
+
+    data = [list(headers)]
+    first = True
+    total = 0
+    for n, row in enumerate(rows, start=1):
+        data.append([*row[:-1], f"{float(row[-1]):.2f}"])
+        total += float(row[-1])
+        if len(data) >= PDF_CHUNK_ROWS:
+            add_table(data, first=first)
+            data, first = [], False
+            if on_chunk:
+                on_chunk(n)
+    data.append([""] * (len(headers) - 2) + ["Total", f"{total:.2f}"])
+    add_table(data, first=first, last=True)
+    return tables, total
+
+
+def build_pdf(story, out, progress=None, start=0):
+    """Build `story` into `out`, reporting page layout as progress(start..100)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    progress = progress or (lambda pct: None)
+    doc = SimpleDocTemplate(out, pagesize=A4, leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30)
+    flowables = {"count": 0}
+
+    def on_build(kind, value):
+        if kind == "SIZE_EST":
+            flowables["count"] = value or 1
+        elif kind == "PROGRESS" and flowables["count"]:
+            progress(start + (100 - start) * min(value, flowables["count"]) // flowables["count"])
+
+    doc.setProgressCallBack(on_build)
+    doc.build(story)
+    progress(100)
@@ -0,0 +1,116 @@
+# accounts/jobs.py
+# DB-backed export job queue; jobs are rendered by `manage.py run_export_worker`.
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import ExportJob
+from .reports import render_report_pdf
+
+# kind -> (report type, file prefix); report_pdf takes its type from the job's params
+EXPORT_KINDS = {
+    'income_pdf': ('income', 'income'),
+    'expense_pdf': ('expense', 'expenses'),
+    'report_pdf': ('both', 'report'),
+}
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def enqueue_export(user, kind, params=None):
+    """Queue a report, reusing the user's pending job of the same kind and params if any."""
+    params = params or {}
+    pending = ExportJob.objects.filter(user=user, kind=kind, status__in=ACTIVE_STATUSES).order_by('-created_at')
+    for job in pending:
+        if job.params == params:
+            return job
+    return ExportJob.objects.create(user=user, kind=kind, params=params)
+
+
+def job_spec(job):
+    """The accounts.reports spec a job renders; jobs queued without one export the owner's full history."""
+    type_ = EXPORT_KINDS[job.kind][0]
+    spec = {'type': type_, 'date_from': None, 'date_to': None, 'modes': [], 'user_id': job.user_id}
+    spec.update(job.params or {})
+    return spec
+
+
+def job_payload(job):
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'status_url': reverse('export_job_status', args=[job.id]),
+    }
+    if job.status == 'done':
+        data['download_url'] = reverse('export_job_download', args=[job.id])
+    if job.status == 'failed':
+        data['error'] = job.error
+    return data
+
+
+def claim_next_job():
+    """Atomically flip the oldest queued job to running; returns its id or None."""
+    while True:
+        job_id = (ExportJob.objects.filter(status='queued')
+                  .order_by('created_at').values_list('id', flat=True).first())
+        if job_id is None:
+            return None
+        claimed = ExportJob.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=timezone.now(), progress=0)
+        if claimed:
+            return job_id
+
+
+def _expiry():
+    return timezone.now() + timedelta(hours=getattr(settings, 'EXPORT_JOB_TTL_HOURS', 24))
+
+
+def requeue_interrupted_jobs():
+    """Put jobs left 'running' by a worker that died back on the queue."""
+    return ExportJob.objects.filter(status='running').update(status='queued', progress=0)
+
+
+def run_job(job_id):
+    """Render one claimed job into MEDIA_ROOT/exports/. Runs inside a pool process."""
+    job = ExportJob.objects.get(pk=job_id)
+    last = {'pct': 0}
+
+    def progress(pct):
+        # throttle DB writes to every 5%
+        if pct >= last['pct'] + 5 or pct == 100:
+            last['pct'] = pct
+            ExportJob.objects.filter(pk=job_id).update(progress=pct)
+
+    try:
+        prefix = EXPORT_KINDS[job.kind][1]
+        name = f"exports/{prefix}_{job.user_id}_{job.id}_{timezone.localdate().isoformat()}.pdf"
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as out:
+            render_report_pdf(job_spec(job), out, progress=progress)
+        ExportJob.objects.filter(pk=job_id).update(
+            status='done', progress=100, file=name,
+            finished_at=timezone.now(), expires_at=_expiry())
+    except Exception as exc:
+        ExportJob.objects.filter(pk=job_id).update(
+            status='failed', error=str(exc),
+            finished_at=timezone.now(), expires_at=_expiry())
+        raise
+    return job_id
+
+
+def purge_expired_jobs():
+    """Delete expired jobs together with their files; returns how many were removed."""
+    expired = ExportJob.objects.filter(expires_at__lt=timezone.now())
+    removed = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        removed += 1
+    return removed
@@ -0,0 +1,157 @@
+# accounts/ledger_cache.py
+# Ledger version numbers (stored in LedgerVersion) and the dashboard context cache keyed by them.
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+
+CACHE_ALIAS = "dashboard"
+SHOP = "shop"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(scope):
+    return f"ledger-version:{scope}"
+
+
+def ledger_version(user_id=None):
+    """Current version of one user's ledger, or of the whole shop when user_id is None.
+
+    One primary-key lookup on LedgerVersion; a scope nobody has written to yet
+    is version 0. Versions are nanosecond timestamps, so they only grow.
+    """
+    from .models import LedgerVersion
+
+    scope = SHOP if user_id is None else str(user_id)
+    version = LedgerVersion.objects.filter(scope=scope).values_list("version", flat=True).first()
+    return version or 0
+
+
+def bump_ledger_version(user_id):
+    """Invalidate cached data (and ETags) for `user_id` and the shop.
+
+    Call it inside the transaction that changes the totals, after the change:
+    the version then commits (or rolls back) with them, and no reader can
+    pair the new version with the old totals.
+    """
+    from .models import LedgerVersion
+
+    now = time.time_ns()
+    LedgerVersion.objects.bulk_create(
+        [LedgerVersion(scope=str(user_id), version=now), LedgerVersion(scope=SHOP, version=now)],
+        update_conflicts=True, unique_fields=["scope"], update_fields=["version"],
+    )
+
+
+def _count(name):
+    cache = _cache()
+    key = f"dashboard-cache:{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def _context_key(user, is_owner, day):
+    # owners see the whole shop, so their entry follows the shop-wide version;
+    # `day` is part of the key because the chart window moves with the calendar
+    scope = SHOP if is_owner else user.id
+    return f"dashboard:{scope}:{ledger_version(None if is_owner else user.id)}:{day.isoformat()}"
+
+
+def cached_context(user, is_owner, day, build):
+    """Return build() from the cache, keyed by the ledger version the viewer depends on."""
+    key = _context_key(user, is_owner, day)
+    cache = _cache()
+    context = cache.get(key)
+    if context is not None:
+        _count("hits")
+        return context
+    _count("misses")
+    context = build()
+    cache.set(key, context)
+    return context
+
+
+async def acached_context(user, is_owner, day, abuild):
+    """cached_context for async views; abuild() returns an awaitable."""
+    key = await sync_to_async(_context_key)(user, is_owner, day)
+    cache = _cache()
+    context = await cache.aget(key)
+    if context is not None:
+        await sync_to_async(_count)("hits")
+        return context
+    await sync_to_async(_count)("misses")
+    context = await abuild()
+    await cache.aset(key, context)
+    return context
+
+
+def cache_stats():
+    cache = _cache()
+    counts = cache.get_many(["dashboard-cache:hits", "dashboard-cache:misses"])
+    hits = counts.get("dashboard-cache:hits", 0)
+    misses = counts.get("dashboard-cache:misses", 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+    }
+
+
+# ---------- conditional GET ----------
+def _etag(request, user, shop_wide, daily):
+    scope = SHOP if shop_wide else user.id
+    parts = [str(user.id), str(scope), str(ledger_version(None if shop_wide else user.id)),
+             request.get_full_path()]
+    if daily:
+        parts.append(timezone.localdate().isoformat())
+    return '"%s"' % hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def ledger_etag(shop_wide=None, daily=False):
+    """Give GET responses a strong ETag from the viewer's ledger version.
+
+    A matching If-None-Match gets a 304 before the view runs: the check is one
+    primary-key lookup on LedgerVersion. shop_wide(user) says whether the view shows the whole
+    shop (and so follows the shop-wide version); `daily` adds today's date for
+    views whose window moves with the calendar. Put it under @login_required.
+    """
+    def decorator(view):
+        def check(request, user):
+            if request.method not in ("GET", "HEAD"):
+                return None, None
+            etag = _etag(request, user, bool(shop_wide and shop_wide(user)), daily)
+            return get_conditional_response(request, etag=etag), etag
+
+        def finish(response, etag):
+            if etag and response.status_code == 200:
+                response.headers.setdefault("ETag", etag)
+            return response
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                user = await request.auser()
+                not_modified, etag = await sync_to_async(check)(request, user)
+                if not_modified is not None:
+                    return not_modified
+                return finish(await view(request, *args, **kwargs), etag)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                not_modified, etag = check(request, request.user)
+                if not_modified is not None:
+                    return not_modified
+                return finish(view(request, *args, **kwargs), etag)
+        return inner
+    return decorator
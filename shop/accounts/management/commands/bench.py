@@ -0,0 +1,147 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from accounts.jobs import enqueue_export, run_job
+
+# name -> (method, path); "pdf" entries render the export job in-process
+ENDPOINTS = {
+    "dashboard": ("GET", "/dashboard/"),
+    "dashboard.cold": ("GET", "/dashboard/"),
+    "activity_view": ("GET", "/activity/"),
+    "activity_api": ("GET", "/activity/api/?limit=25"),
+    "api_list_expenses": ("GET", "/expenses/api/list/"),
+    "api_list_expenses.filtered": ("GET", "/expenses/api/list/?mode=cash&date_from=2000-01-01"),
+    "api_list": ("GET", "/income/api/list/"),
+    "api_list.columns": ("GET", "/income/api/list/?limit=200&format=columns"),
+    "export_expenses_excel": ("GET", "/expenses/export/excel/"),
+    "export_income_excel": ("GET", "/income/export/excel/"),
+    "export_expenses_csv": ("GET", "/expenses/export/csv/"),
+    "export_expenses_pdf": ("pdf", "expense_pdf"),
+    "export_income_pdf": ("pdf", "income_pdf"),
+}
+SLOW = {"export_expenses_excel", "export_income_excel", "export_expenses_csv",
+        "export_expenses_pdf", "export_income_pdf"}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ("Call each ledger view through the test client and write p50/p95/p99 latency, "
+            "query count and peak memory to a JSON file.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username the requests are made as.")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--export-iterations", type=int, default=3,
+                            help="Iterations for the (slow) export endpoints.")
+        parser.add_argument("--only", action="append", choices=sorted(ENDPOINTS),
+                            help="Endpoint to run (repeatable); default all.")
+        parser.add_argument("--output", default="bench.json")
+        parser.add_argument("--compare", help="Earlier bench JSON to print p50/p95 changes against.")
+
+    def _call(self, client, user, name):
+        method, target = ENDPOINTS[name]
+        if name == "dashboard.cold":
+            caches["dashboard"].clear()
+        if method == "pdf":
+            job = enqueue_export(user, target)
+            run_job(job.id)
+            job.refresh_from_db()
+            if job.file:
+                job.file.delete(save=False)
+            job.delete()
+            return 200 if job.status == "done" else 500
+        response = client.get(target)
+        # exports stream; the body has to be drained for the timing to mean anything
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        else:
+            _ = response.content
+        return response.status_code
+
+    def _measure(self, client, user, name, iterations):
+        status = self._call(client, user, name)  # warm-up
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            self._call(client, user, name)
+            timings.append((time.perf_counter() - start) * 1000)
+        with CaptureQueriesContext(connection) as ctx:
+            self._call(client, user, name)
+        queries = len(ctx)
+        tracemalloc.start()
+        try:
+            self._call(client, user, name)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            "status": status,
+            "iterations": iterations,
+            "p50_ms": round(_percentile(timings, 50), 2),
+            "p95_ms": round(_percentile(timings, 95), 2),
+            "p99_ms": round(_percentile(timings, 99), 2),
+            "mean_ms": round(statistics.fmean(timings), 2),
+            "queries": queries,
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}")
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+
+        results = {}
+        for name in options["only"] or list(ENDPOINTS):
+            iterations = options["export_iterations"] if name in SLOW else options["iterations"]
+            results[name] = self._measure(client, user, name, max(1, iterations))
+            r = results[name]
+            self.stdout.write(f"{name:<28} {r['status']}  p50 {r['p50_ms']:9.1f}  p95 {r['p95_ms']:9.1f}  "
+                              f"p99 {r['p99_ms']:9.1f} ms  {r['queries']:3d} queries  peak {r['peak_kb']:9.1f} KB")
+
+        report = {
+            "meta": {
+                "user": user.username,
+                "role": getattr(getattr(user, "profile", None), "role", "staff"),
+                "incomes": user.income_set.count(),
+                "expenses": user.expenses.count(),
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(options["output"], "w") as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"wrote {options['output']}"))
+
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                before = json.load(fh)["results"]
+            for name, r in results.items():
+                old = before.get(name)
+                if not old:
+                    continue
+                changes = "  ".join(
+                    f"{key} {100 * (r[key] - old[key]) / old[key]:+.0f}%" if old[key] else f"{key} n/a"
+                    for key in ("p50_ms", "p95_ms", "queries", "peak_kb")
+                )
+                self.stdout.write(f"{name:<28} {changes}")
@@ -0,0 +1,81 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+
+from accounts import serialization
+from accounts.serialization import FastJsonResponse, ledger_columns, ledger_rows, ledger_values
+from expenses.models import Expense
+from income.models import Income
+
+PER = 10_000
+
+
+class Command(BaseCommand):
+    help = ("Time ledger JSON serialization per 10k rows: model instances + as_dict() + JsonResponse "
+            "against values_list tuples + orjson, as row objects and as columns.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Whose rows to serialize.")
+        parser.add_argument("--ledger", choices=["expense", "income"], default="expense")
+        parser.add_argument("--rows", type=int, default=PER)
+        parser.add_argument("--repeat", type=int, default=5, help="Best of N runs per variant.")
+
+    def _best(self, fn, repeat):
+        best, size = None, 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            size = len(fn())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, size
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}")
+        model = Expense if options["ledger"] == "expense" else Income
+        qs = model.objects.filter(user=user).order_by("-date", "-id")[:options["rows"]]
+        n = len(list(qs.values_list("id", flat=True)))
+        if not n:
+            raise CommandError(f"User has no {options['ledger']} rows; seed some with seed_ledger")
+
+        def legacy():
+            # what the list APIs did before: one model instance and one dict per row
+            return JsonResponse({"results": [
+                {"id": o.id, "date": o.date.strftime("%Y-%m-%d"), "description": o.description,
+                 "mode": o.mode, "amount": str(o.amount)}
+                for o in qs.all()  # a fresh queryset each run, not the cached result
+            ]}).content
+
+        def fetch_tuples():
+            return list(ledger_values(qs))
+
+        def fast():
+            return FastJsonResponse({"results": ledger_rows(list(ledger_values(qs)))}).content
+
+        def stdlib():
+            return json.dumps({"results": ledger_rows(list(ledger_values(qs)))}).encode()
+
+        def columns():
+            return FastJsonResponse({"columns": ledger_columns(list(ledger_values(qs)))}).content
+
+        variants = [
+            ("models + dicts + json", legacy),
+            ("values_list fetch only", fetch_tuples),
+            ("values_list + json", stdlib),
+            ("values_list + fast", fast),
+            ("values_list + columns", columns),
+        ]
+        encoder = "orjson" if serialization.orjson is not None else "stdlib json (orjson not installed)"
+        self.stdout.write(f"{n} rows, best of {options['repeat']}, fast encoder: {encoder}")
+        baseline = None
+        for name, fn in variants:
+            seconds, size = self._best(fn, max(1, options["repeat"]))
+            per_10k = seconds * 1000 * PER / n
+            baseline = baseline or per_10k
+            self.stdout.write(f"{name:<26} {per_10k:8.1f} ms/10k rows  {n / seconds:10.0f} rows/s  "
+                              f"{size / 1024:8.1f} KB  x{baseline / per_10k:.2f}")
@@ -0,0 +1,127 @@
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+DEFAULT_PATHS = ["/expenses/api/list/", "/income/api/list/", "/dashboard/api/"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"server on port {port} did not start")
+
+
+def _fetch(url, cookie):
+    req = urllib.request.Request(url, headers={"Cookie": cookie})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+            ok = resp.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ("Compare concurrent JSON API throughput under gunicorn (WSGI, sync workers) and uvicorn "
+            "(ASGI) with the same number of worker processes. Both servers are started as "
+            "subprocesses against the configured database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username the requests are made as.")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per path and server.")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--workers", type=int, default=4, help="Worker processes per server.")
+        parser.add_argument("--path", action="append", dest="paths",
+                            help=f"Path to hit (repeatable); default {' '.join(DEFAULT_PATHS)}.")
+
+    def _session_cookie(self, user):
+        engine = import_string(settings.SESSION_ENGINE + ".SessionStore")
+        session = engine()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session, f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+    def _run(self, name, cmd, paths, cookie, options):
+        port = _free_port()
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "finance.settings"))
+        proc = subprocess.Popen([part.format(port=port) for part in cmd], cwd=settings.BASE_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_for(port)
+            for path in paths:
+                url = f"http://127.0.0.1:{port}{path}"
+                _fetch(url, cookie)  # warm up imports and caches
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                    results = list(pool.map(lambda _: _fetch(url, cookie), range(options["requests"])))
+                elapsed = time.perf_counter() - start
+                latencies = [t * 1000 for t, _ in results]
+                errors = sum(1 for _, ok in results if not ok)
+                self.stdout.write(
+                    f"{name:<6} {path:<24} {len(results) / elapsed:8.1f} req/s  "
+                    f"p50 {statistics.median(latencies):7.1f} ms  p95 {_percentile(latencies, 95):7.1f} ms  "
+                    f"p99 {_percentile(latencies, 99):7.1f} ms  errors {errors}"
+                )
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    def handle(self, *args, **options):
+        for module in ("gunicorn", "uvicorn"):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is not installed (pip install {module})")
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}")
+        paths = options["paths"] or DEFAULT_PATHS
+        session, cookie = self._session_cookie(user)
+        workers = str(max(1, options["workers"]))
+        # production servers on both sides, one process per worker each: the
+        # difference is sync request handling vs the async views on an event loop
+        servers = [
+            ("wsgi", [sys.executable, "-m", "gunicorn", "finance.wsgi:application", "--worker-class", "sync",
+                      "--workers", workers, "--bind", "127.0.0.1:{port}", "--log-level", "warning"]),
+            ("asgi", [sys.executable, "-m", "uvicorn", "finance.asgi:application", "--workers", workers,
+                      "--port", "{port}", "--log-level", "warning"]),
+        ]
+        self.stdout.write(f"{options['requests']} requests per path, {options['concurrency']} concurrent, "
+                          f"{workers} workers per server")
+        try:
+            for name, cmd in servers:
+                self._run(name, cmd, paths, cookie, options)
+        finally:
+            session.delete()
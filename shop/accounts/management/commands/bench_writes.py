@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+
+BENCH_USER = "_bench_writer"
+# the settings.py profile before WAL: rollback journal, 5s timeout, deferred BEGIN
+LEGACY_OPTIONS = {"init_command": "PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL;"}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+@contextmanager
+def _db_options(options):
+    """Swap the default database OPTIONS for connections opened inside the block."""
+    db_settings = connections.settings["default"]
+    saved = db_settings["OPTIONS"]
+    connections.close_all()
+    db_settings["OPTIONS"] = options
+    try:
+        yield
+    finally:
+        connections.close_all()
+        db_settings["OPTIONS"] = saved
+
+
+class Command(BaseCommand):
+    help = ("Measure ledger write latency (p50/p95/p99) with concurrent writers and readers "
+            "under the legacy SQLite profile, WAL, and WAL plus the single-writer queue.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writes", type=int, default=50, help="Writes per writer thread.")
+        parser.add_argument("--profile", action="append", dest="profiles",
+                            choices=["legacy", "wal", "wal+queue"],
+                            help="Profile to run (repeatable); default all three.")
+
+    def _client(self, user):
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+        return client
+
+    def _writer(self, user, count, latencies, errors):
+        client = self._client(user)
+        try:
+            for i in range(count):
+                body = {"date": "2000-01-01", "description": f"bench {i}", "mode": "cash", "amount": "1.00"}
+                start = time.perf_counter()
+                try:
+                    resp = client.post("/expenses/api/add/", json.dumps(body), content_type="application/json")
+                    ok = resp.status_code == 200
+                except Exception:
+                    ok = False
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not ok:
+                    errors.append(i)
+        finally:
+            connections.close_all()
+
+    def _reader(self, user, stop, latencies):
+        client = self._client(user)
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                client.get("/expenses/api/list/?limit=50")
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+
+    def _run(self, name, user, options):
+        write_ms, read_ms, errors = [], [], []
+        stop = threading.Event()
+        writers = [threading.Thread(target=self._writer, args=(user, options["writes"], write_ms, errors))
+                   for _ in range(options["writers"])]
+        readers = [threading.Thread(target=self._reader, args=(user, stop, read_ms))
+                   for _ in range(options["readers"])]
+        start = time.perf_counter()
+        for t in readers + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for t in readers:
+            t.join()
+        self.stdout.write(
+            f"{name:<10} writes {len(write_ms) / elapsed:7.1f}/s  "
+            f"p50 {_percentile(write_ms, 50):7.1f}  p95 {_percentile(write_ms, 95):7.1f}  "
+            f"p99 {_percentile(write_ms, 99):7.1f} ms  errors {len(errors)}  |  "
+            f"reads p99 {_percentile(read_ms, 99):7.1f} ms ({len(read_ms)})"
+        )
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"] or ["legacy", "wal", "wal+queue"]
+        user, _ = User.objects.get_or_create(username=BENCH_USER)
+        configured = connections.settings["default"]["OPTIONS"]
+        self.stdout.write(f"{options['writers']} writers x {options['writes']} writes, "
+                          f"{options['readers']} readers")
+        try:
+            for name in profiles:
+                db_options = LEGACY_OPTIONS if name == "legacy" else configured
+                with _db_options(db_options), override_settings(SQLITE_WRITE_QUEUE=name == "wal+queue"):
+                    self._run(name, user, options)
+        finally:
+            # leave the database in the configured journal mode, without the bench rows
+            connections.close_all()
+            user.delete()
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
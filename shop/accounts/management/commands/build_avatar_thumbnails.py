@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from accounts.avatars import build_pending_thumbnails
+
+
+class Command(BaseCommand):
+    help = ("Build the avatar thumbnails that are missing or out of date: once after deploying "
+            "thumbnails, and after a restart dropped queued builds.")
+
+    def handle(self, *args, **options):
+        built = build_pending_thumbnails()
+        self.stdout.write(self.style.SUCCESS(f"Built thumbnails for {built} avatars."))
@@ -0,0 +1,110 @@
+import re
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+
+from accounts.activity import activity_page
+from accounts.exports import csv_values
+from accounts.pagination import filter_ledger, keyset_page
+from accounts.reports import section_queryset
+from accounts.serialization import ledger_values, row_key
+from expenses.models import Expense
+from income.models import Income
+
+# "SCAN income_income" without an index, or an ORDER BY / GROUP BY that needs a sort
+FULL_SCAN = re.compile(r"\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)")
+TEMP_SORT = "USE TEMP B-TREE"
+
+
+def hot_queries(user_id=1):
+    """The ledger queries the views run on every request, keyed by a short name.
+
+    Built with the views' own helpers. A value is a queryset, or a call that
+    runs the view's code path (for aggregates and pages); every query it sends
+    is checked.
+    """
+    since = date(2000, 1, 1)
+    queries = {}
+    for name, model in (("expense", Expense), ("income", Income)):
+        mine = model.objects.filter(user_id=user_id)
+
+        def list_page(params, mine=mine):
+            # api_list_*: filter_ledger + ledger_values + keyset_page
+            params = QueryDict(params)
+            return keyset_page(ledger_values(filter_ledger(mine, params)), params, key=row_key)
+
+        def list_total(params, mine=mine):
+            return filter_ledger(mine, QueryDict(params)).aggregate(total=Sum("amount"))
+
+        queries.update({
+            f"{name}.list.first_page": lambda list_page=list_page: list_page("limit=50"),
+            f"{name}.list.next_page": lambda list_page=list_page: list_page("limit=50&cursor=2000-01-01_1"),
+            f"{name}.list.mode_filter": lambda list_page=list_page: list_page("limit=50&mode=cash"),
+            f"{name}.list.date_filter": lambda list_page=list_page: list_page("limit=50&date_from=2000-01-01"),
+            f"{name}.list.total": lambda list_total=list_total: list_total(""),
+            f"{name}.list.total.date_filter": lambda list_total=list_total: list_total("date_from=2000-01-01"),
+            f"{name}.staff_dashboard": mine.order_by("-date"),
+            f"{name}.export": csv_values(filter_ledger(mine, QueryDict()).order_by("date", "id")),
+        })
+        last_month = {"date_from": "2000-01-01", "date_to": "2000-01-31", "modes": []}
+        queries.update({
+            f"{name}.report.user": section_queryset(name, {**last_month, "user_id": user_id}),
+            f"{name}.report.shop": section_queryset(name, {**last_month, "user_id": None}),
+            f"{name}.report.shop_modes": section_queryset(name, {**last_month, "user_id": None, "modes": ["cash"]}),
+        })
+    queries.update({
+        "activity.staff": lambda: activity_page(user_id, limit=25),
+        "activity.staff.next_page": lambda: activity_page(user_id, "2000-01-01_1_income", limit=25),
+        "activity.owner": lambda: activity_page(None, limit=25),
+        "owner.staff_detail": lambda: activity_page(user_id, limit=50, date_from=since, date_to=date(2000, 12, 31)),
+    })
+    return queries
+
+
+def query_plans(query):
+    """EXPLAIN output for a hot_queries() value: one plan per query it runs."""
+    if not callable(query):
+        return [query.explain()]
+    with CaptureQueriesContext(connection) as captured:
+        query()
+    plans = []
+    with connection.cursor() as cursor:
+        for q in captured.captured_queries:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {q['sql']}")
+            # the same layout as QuerySet.explain() on SQLite
+            plans.append("\n".join(" ".join(map(str, row)) for row in cursor.fetchall()))
+    return plans
+
+
+def plan_problems(plan):
+    problems = [f"full scan of {t}" for t in FULL_SCAN.findall(plan)
+                if t.startswith(("income_", "expenses_"))]
+    if TEMP_SORT in plan:
+        problems.append("temp B-tree sort")
+    return problems
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot Income/Expense queries and fail on full scans or temp B-tree sorts."
+
+    def handle(self, *args, **options):
+        failures = 0
+        for name, query in hot_queries().items():
+            plans = query_plans(query)
+            problems = [p for plan in plans for p in plan_problems(plan)]
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {', '.join(problems)}"))
+                for plan in plans:
+                    self.stdout.write(f"    {plan}")
+            else:
+                self.stdout.write(f"ok   {name}")
+            if options["verbosity"] > 1:
+                for plan in plans:
+                    self.stdout.write(f"    {plan}")
+        if failures:
+            raise CommandError(f"{failures} hot queries have a bad plan")
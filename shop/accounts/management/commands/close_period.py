@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.closing import close_months, closed_through, last_closed_month
+from accounts.writer import ledger_write
+
+
+class Command(BaseCommand):
+    help = ("Close every open month up to --through (default: last month), freezing each user's "
+            "and the shop's totals. Run it from cron early each month.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--through", help="Last month to close, YYYY-MM.")
+
+    def handle(self, *args, **options):
+        if options["through"]:
+            try:
+                year, month = options["through"].split("-", 1)
+                through = date(int(year), int(month), 1)
+            except ValueError:
+                raise CommandError("--through looks like YYYY-MM")
+            if through > last_closed_month():
+                raise CommandError("Only months that have ended can be closed")
+        else:
+            through = last_closed_month()
+        closed = ledger_write(close_months, through)
+        if closed:
+            self.stdout.write(self.style.SUCCESS(
+                f"Closed {len(closed)} months, {closed[0]:%Y-%m} to {closed[-1]:%Y-%m}."))
+        else:
+            current = closed_through()
+            self.stdout.write(f"Nothing to close; closed through {current:%Y-%m}." if current
+                              else "Nothing to close.")
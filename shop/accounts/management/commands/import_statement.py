@@ -0,0 +1,41 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.statements import StatementError, import_statement, mode_from_name, statement_rows
+
+
+class Command(BaseCommand):
+    help = "Import a bank statement (CSV or XLSX) as Income/Expense rows for one user."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True, help="Username the rows belong to.")
+        parser.add_argument("--mode", help="Account the statement is for (icici, sbi, ...); "
+                                           "guessed from the file name when omitted.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}")
+        mode = options["mode"] or mode_from_name(os.path.basename(path))
+
+        def progress(stats):
+            self.stdout.write(f"{stats['lines']} lines: {stats['income']} income, "
+                              f"{stats['expense']} expense, {stats['skipped']} skipped")
+
+        try:
+            with open(path, "rb") as fh:
+                stats = import_statement(user, statement_rows(fh, path), mode,
+                                         chunk_size=max(1, options["chunk_size"]), progress=progress)
+        except (OSError, StatementError) as exc:
+            raise CommandError(str(exc))
+        for error in stats["errors"]:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['income']} income and {stats['expense']} expense rows "
+            f"({stats['skipped']} skipped)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than SYNC_TOMBSTONE_DAYS (schedule it daily, e.g. from cron)."
+
+    def handle(self, *args, **options):
+        purged = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} sync tombstones."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dashboard ledger rollups from the Income and Expense tables."
+
+    def handle(self, *args, **options):
+        created = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} rollup rows."))
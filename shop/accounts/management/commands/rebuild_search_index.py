@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ledger_search full-text index from the Income and Expense tables."
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("ledger_search is an SQLite FTS5 table; other databases search without it")
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} descriptions."))
@@ -0,0 +1,66 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from accounts import worker
+from accounts.jobs import claim_next_job, purge_expired_jobs, requeue_interrupted_jobs
+
+PURGE_EVERY = 60  # seconds
+
+
+class Command(BaseCommand):
+    help = "Render queued export jobs (PDF reports) in a local process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=getattr(settings, "EXPORT_WORKERS", 2))
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds between queue polls.")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        # spawned children set Django up from scratch instead of sharing our DB connection
+        ctx = multiprocessing.get_context("spawn")
+        running = set()
+        last_purge = 0.0
+        # one worker command per database: anything still "running" was orphaned
+        requeued = requeue_interrupted_jobs()
+        if requeued:
+            self.stdout.write(f"requeued {requeued} interrupted jobs")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=worker.init) as pool:
+            while True:
+                try:
+                    if time.monotonic() - last_purge > PURGE_EVERY:
+                        purged = purge_expired_jobs()
+                        if purged:
+                            self.stdout.write(f"purged {purged} expired exports")
+                        last_purge = time.monotonic()
+
+                    while len(running) < workers:
+                        job_id = claim_next_job()
+                        if job_id is None:
+                            break
+                        self.stdout.write(f"job {job_id} started")
+                        running.add(pool.submit(worker.run, job_id))
+                except OperationalError as exc:
+                    # e.g. "database is locked" while a writer commits; retry next poll
+                    self.stderr.write(f"queue poll failed: {exc}")
+                finally:
+                    connections.close_all()
+
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                done, running = wait(running, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                for future in done:
+                    exc = future.exception()
+                    if exc:
+                        self.stderr.write(f"job failed: {exc}")
+                    else:
+                        self.stdout.write(f"job {future.result()} done")
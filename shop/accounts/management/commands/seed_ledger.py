@@ -0,0 +1,111 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import Profile
+from accounts.rollups import add_rows
+from expenses.models import Expense
+from income.models import Income, MODE_CHOICES
+
+DEFAULT_MODES = "cash=6,icici=3,sbi=3,hdfc=2,idfc=1,d_cash=1,alpha=1"
+DESCRIPTIONS = {
+    "income": ["Sales", "Counter sale", "UPI receipt", "Card settlement", "Customer transfer"],
+    "expense": ["Stock purchase", "Rent", "Electricity", "Salary", "Transport", "Tea & snacks"],
+}
+
+
+def parse_weights(spec):
+    """"cash=6,icici=3" -> ([modes], [weights]); raises CommandError."""
+    known = {key for key, _ in MODE_CHOICES}
+    modes, weights = [], []
+    for part in spec.split(","):
+        mode, _, weight = part.strip().partition("=")
+        if mode not in known:
+            raise CommandError(f"Unknown mode {mode!r}")
+        try:
+            weights.append(float(weight or 1))
+        except ValueError:
+            raise CommandError(f"Bad weight in {part!r}")
+        modes.append(mode)
+    return modes, weights
+
+
+class Command(BaseCommand):
+    help = "Generate N users with M incomes and M expenses each, for load testing (bulk_create)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--rows", type=int, default=1000, help="Incomes and expenses per user (each).")
+        parser.add_argument("--prefix", default="seed", help="Usernames are <prefix>001, <prefix>002, ...")
+        parser.add_argument("--owner", action="store_true", help="Also create <prefix>_owner with the owner role.")
+        parser.add_argument("--modes", default=DEFAULT_MODES, help="Mode weights, e.g. cash=6,icici=3.")
+        parser.add_argument("--days", type=int, default=730, help="Spread entries over this many days back.")
+        parser.add_argument("--date-dist", choices=["uniform", "recent"], default="recent",
+                            help="'recent' skews entries towards today.")
+        parser.add_argument("--password", default="seed-password")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for repeatable data.")
+
+    def _random_date(self, rng, today, days, dist):
+        if dist == "uniform":
+            back = rng.randint(0, days)
+        else:
+            back = int(rng.triangular(0, days, 0))
+        return today - timedelta(days=back)
+
+    def _users(self, options):
+        prefix = options["prefix"]
+        names = [f"{prefix}{i:03d}" for i in range(1, options["users"] + 1)]
+        roles = {name: "staff" for name in names}
+        if options["owner"]:
+            roles[f"{prefix}_owner"] = "owner"
+        if User.objects.filter(username__in=roles).exists():
+            raise CommandError(f"Users with prefix {prefix!r} already exist; pick another --prefix")
+        # one hash for everyone: hashing per user would dominate the run
+        password = make_password(options["password"])
+        User.objects.bulk_create([User(username=n, password=password) for n in roles])
+        users = list(User.objects.filter(username__in=roles).order_by("username"))
+        # bulk_create skips the post_save receiver that makes profiles
+        Profile.objects.bulk_create([Profile(user=u, name=u.username, role=roles[u.username]) for u in users])
+        return [u for u in users if roles[u.username] == "staff"]
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        modes, weights = parse_weights(options["modes"])
+        today = date.today()
+        batch_size = max(1, options["batch_size"])
+
+        with transaction.atomic():
+            users = self._users(options)
+        self.stdout.write(f"created {len(users)} users")
+
+        for type_, model in (("income", Income), ("expense", Expense)):
+            amounts = (100, 50000) if type_ == "income" else (20, 20000)
+            descriptions = DESCRIPTIONS[type_]
+            created = 0
+            for user in users:
+                remaining = options["rows"]
+                while remaining:
+                    n = min(batch_size, remaining)
+                    objs = [
+                        model(
+                            user=user,
+                            date=self._random_date(rng, today, options["days"], options["date_dist"]),
+                            description=rng.choice(descriptions),
+                            mode=rng.choices(modes, weights)[0],
+                            amount=Decimal(rng.randint(amounts[0] * 100, amounts[1] * 100)) / 100,
+                        )
+                        for _ in range(n)
+                    ]
+                    with transaction.atomic():
+                        model.objects.bulk_create(objs)
+                        add_rows(type_, [(user.id, o.date, o.mode, o.amount, 1) for o in objs])
+                    remaining -= n
+                    created += n
+            self.stdout.write(f"created {created} {type_} rows")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from accounts.balances import take_snapshots
+from accounts.writer import ledger_write
+
+
+class Command(BaseCommand):
+    help = ("Write month-end account balance snapshots for every closed month that has none "
+            "(schedule it daily, e.g. from cron).")
+
+    def handle(self, *args, **options):
+        created = ledger_write(take_snapshots)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} balance snapshots."))
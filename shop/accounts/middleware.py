@@ -0,0 +1,170 @@
+# accounts/middleware.py
+# Per-request SQL/view/template timings as Server-Timing headers, plus a slow-request log.
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger("shop.slow_requests")
+
+# set for the duration of one request; async views' ORM threads inherit it
+_current = ContextVar("request_timing", default=None)
+SLOW_LOG_QUERIES = 20
+
+
+class _Timing:
+    __slots__ = ("queries", "sql_time", "template_time", "template_depth", "view_start")
+
+    def __init__(self):
+        self.queries = []  # (sql, params, seconds); params are only compared, never logged
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.view_start = None
+
+
+def _record_sql(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        timing.sql_time += elapsed
+        timing.queries.append((sql, params, elapsed))
+
+
+def _wrap_connection(sender, connection, **kwargs):
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_sql)
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return render(self, *args, **kwargs)
+        # only the outermost render counts; includes render nested templates
+        timing.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            timing.template_depth -= 1
+            if not timing.template_depth:
+                timing.template_time += time.perf_counter() - start
+    wrapper.__wrapped__ = render
+    return wrapper
+
+
+def install():
+    """Hook every DB connection and the Django template backend; called from AppConfig.ready()."""
+    from django.db import connections
+    from django.template.backends.django import Template
+
+    connection_created.connect(_wrap_connection, dispatch_uid="accounts.request_timing")
+    for conn in connections.all(initialized_only=True):
+        _wrap_connection(None, conn)
+    if not hasattr(Template.render, "__wrapped__"):
+        Template.render = _timed_render(Template.render)
+
+
+def _duplicates(queries):
+    """(exact repeats, same-SQL-different-params repeats) — the latter is the N+1 signature."""
+    exact = Counter((sql, repr(params)) for sql, params, _ in queries)
+    similar = Counter(sql for sql, _, _ in queries)
+    return (sum(n - 1 for n in exact.values()),
+            [(sql, n) for sql, n in similar.most_common() if n > 1])
+
+
+class RequestTimingMiddleware:
+    """Time SQL, the view and template rendering for each request.
+
+    Adds a Server-Timing header (when SERVER_TIMING_HEADERS is on) and logs a
+    JSON record with the slowest and most repeated SQL for requests slower than
+    SLOW_REQUEST_MS. Streaming bodies are produced after the response leaves
+    here, so their queries are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = getattr(settings, "SERVER_TIMING_HEADERS", settings.DEBUG)
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_MS", 500)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = _Timing()
+        token = _current.set(timing)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, timing, start)
+        return response
+
+    async def __acall__(self, request):
+        timing = _Timing()
+        token = _current.set(timing)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, timing, start)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.view_start = time.perf_counter()
+
+    def _finish(self, request, response, timing, start):
+        end = time.perf_counter()
+        total_ms = (end - start) * 1000
+        view_ms = (end - timing.view_start) * 1000 if timing.view_start else 0.0
+        sql_ms = timing.sql_time * 1000
+        template_ms = timing.template_time * 1000
+        duplicates, similar = _duplicates(timing.queries)
+
+        if self.headers:
+            response["Server-Timing"] = ", ".join([
+                f'sql;dur={sql_ms:.1f};desc="{len(timing.queries)} queries, {duplicates} duplicates"',
+                f"view;dur={view_ms:.1f}",
+                f"tpl;dur={template_ms:.1f}",
+                f"total;dur={total_ms:.1f}",
+            ])
+
+        if total_ms >= self.slow_ms:
+            slowest = sorted(timing.queries, key=lambda q: q[2], reverse=True)[:SLOW_LOG_QUERIES]
+            logger.warning(json.dumps({
+                "event": "slow_request",
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                # only if auth already loaded it; resolving request.user here could query
+                "user_id": getattr(getattr(request, "_cached_user", None)
+                                   or getattr(request, "_acached_user", None), "pk", None),
+                "total_ms": round(total_ms, 1),
+                "view_ms": round(view_ms, 1),
+                "sql_ms": round(sql_ms, 1),
+                "template_ms": round(template_ms, 1),
+                "queries": len(timing.queries),
+                "duplicate_queries": duplicates,
+                "repeated_sql": [{"sql": sql, "count": n} for sql, n in similar[:5]],
+                # SQL text only: params carry session keys and other user data
+                "slowest_sql": [{"sql": sql, "ms": round(t * 1000, 2)} for sql, _, t in slowest],
+            }))
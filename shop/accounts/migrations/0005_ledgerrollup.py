@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+
+import accounts.models
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    LedgerRollup = apps.get_model('accounts', 'LedgerRollup')
+    for label, type_ in (('income.Income', 'income'), ('expenses.Expense', 'expense')):
+        model = apps.get_model(label)
+        rows = (model.objects.annotate(month=TruncMonth('date'))
+                .values('user_id', 'month', 'mode')
+                .annotate(total=Sum('amount'), count=Count('id'))
+                .order_by())
+        LedgerRollup.objects.bulk_create([
+            LedgerRollup(user_id=r['user_id'], month=r['month'], mode=r['mode'] or '',
+                         type=type_, total=r['total'] or 0, count=r['count'])
+            for r in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_transaction'),
+        ('expenses', '0001_initial'),
+        ('income', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/', validators=[django.core.validators.FileExtensionValidator(['jpg', 'jpeg', 'png', 'gif']), accounts.models.validate_avatar_size]),
+        ),
+        migrations.CreateModel(
+            name='LedgerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('mode', models.CharField(blank=True, max_length=50)),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', 'type'], name='ledger_rollup_month_type')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'mode', 'type'), name='uniq_ledger_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Full-text index over Income/Expense descriptions (see accounts/search.py).
+from django.db import migrations
+
+# rowid = id * 2 for income, id * 2 + 1 for expense; the owner/kind columns hold
+# "u<user_id>" and "income"/"expense" tokens so scoping is part of the MATCH
+SOURCES = (("income_income", "income", 0), ("expenses_expense", "expense", 1))
+
+CREATE = [
+    "CREATE VIRTUAL TABLE ledger_search USING fts5("
+    "description, owner, kind, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')",
+]
+for table, kind, parity in SOURCES:
+    CREATE += [
+        f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO ledger_search(rowid, description, owner, kind) "
+        f"VALUES (new.id * 2 + {parity}, new.description, 'u' || new.user_id, '{kind}'); END",
+        f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM ledger_search WHERE rowid = old.id * 2 + {parity}; END",
+        f"CREATE TRIGGER {table}_search_au AFTER UPDATE OF description, user_id ON {table} BEGIN "
+        f"UPDATE ledger_search SET description = new.description, owner = 'u' || new.user_id "
+        f"WHERE rowid = old.id * 2 + {parity}; END",
+        f"INSERT INTO ledger_search(rowid, description, owner, kind) "
+        f"SELECT id * 2 + {parity}, description, 'u' || user_id, '{kind}' FROM {table}",
+    ]
+
+DROP = [f"DROP TRIGGER IF EXISTS {table}_search_{suffix}"
+        for table, _, _ in SOURCES for suffix in ("ai", "ad", "au")]
+DROP.append("DROP TABLE IF EXISTS ledger_search")
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; elsewhere accounts.search falls back to icontains
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_closed_periods'),
+        ('income', '0003_income_updated_at'),
+        ('expenses', '0003_sync_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE), _run(DROP)),
+    ]
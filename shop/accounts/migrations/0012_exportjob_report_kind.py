@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_profile_avatar_thumbs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('income_pdf', 'Income PDF'), ('expense_pdf', 'Expense PDF'), ('report_pdf', 'Report PDF')], max_length=20),
+        ),
+    ]
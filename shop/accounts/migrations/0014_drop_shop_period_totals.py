@@ -0,0 +1,18 @@
+# Shop-wide PeriodTotal rows (user=None) are now summed from the per-user rows.
+from django.db import migrations
+
+
+def drop_shop_rows(apps, schema_editor):
+    # they kept deleted users' closed months in the shop figures
+    apps.get_model("accounts", "PeriodTotal").objects.filter(user__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_ledgerversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_shop_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Re-key ledger_search by entry date so search pages newest first across both tables.
+from django.db import migrations
+
+# rowid = date.toordinal() << 32 | id << 1 | parity (0 income, 1 expense), see
+# accounts/search.py; julianday(date) - 1721424.5 is the ordinal in SQL
+SOURCES = (("income_income", "income", 0), ("expenses_expense", "expense", 1))
+
+
+def _key(row, parity):
+    return (f"((CAST(julianday({row}date) - 1721424.5 AS INTEGER) << 32) "
+            f"| ({row}id << 1) | {parity})")
+
+
+def _date_key_update(table, kind, parity):
+    # a date edit moves the row, so the update trigger re-inserts it
+    return (f"CREATE TRIGGER {table}_search_au AFTER UPDATE OF description, user_id, date ON {table} BEGIN "
+            f"DELETE FROM ledger_search WHERE rowid = {_key('old.', parity)}; "
+            f"INSERT INTO ledger_search(rowid, description, owner, kind) "
+            f"VALUES ({_key('new.', parity)}, new.description, 'u' || new.user_id, '{kind}'); END")
+
+
+def _old_key(row, parity):
+    return f"{row}id * 2 + {parity}"
+
+
+def _old_update(table, kind, parity):
+    return (f"CREATE TRIGGER {table}_search_au AFTER UPDATE OF description, user_id ON {table} BEGIN "
+            f"UPDATE ledger_search SET description = new.description, owner = 'u' || new.user_id "
+            f"WHERE rowid = {_old_key('old.', parity)}; END")
+
+
+def _rekey(key, update_trigger):
+    statements = []
+    for table, kind, parity in SOURCES:
+        statements += [f"DROP TRIGGER IF EXISTS {table}_search_{suffix}" for suffix in ("ai", "ad", "au")]
+        statements += [
+            f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO ledger_search(rowid, description, owner, kind) "
+            f"VALUES ({key('new.', parity)}, new.description, 'u' || new.user_id, '{kind}'); END",
+            f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM ledger_search WHERE rowid = {key('old.', parity)}; END",
+            update_trigger(table, kind, parity),
+        ]
+    statements.append("DELETE FROM ledger_search")
+    statements += [
+        f"INSERT INTO ledger_search(rowid, description, owner, kind) "
+        f"SELECT {key('', parity)}, description, 'u' || user_id, '{kind}' FROM {table}"
+        for table, kind, parity in SOURCES
+    ]
+    statements.append("INSERT INTO ledger_search(ledger_search) VALUES ('optimize')")
+    return statements
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_drop_shop_period_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(_rekey(_key, _date_key_update)), _run(_rekey(_old_key, _old_update))),
+    ]
@@ -11,8 +11,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.urls import reverse
 
 def validate_avatar_size(file):
     limit = 1024 * 1024  # 1 MB
@@ -31,9 +30,26 @@ class Profile(models.Model):
     email = models.EmailField(blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True,validators=[FileExtensionValidator(['jpg','jpeg','png','gif']), validate_avatar_size])
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='staff')
+    # {"source": avatar name, "webp": name, "jpg": name}, written by accounts.avatars
+    avatar_thumbs = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f"{self.user.username} ({self.role})"
+
+    def _thumb_url(self, fmt):
+        thumbs = self.avatar_thumbs or {}
+        if self.avatar and thumbs.get("source") == self.avatar.name and thumbs.get(fmt):
+            return reverse("avatar_thumbnail", args=[thumbs[fmt].rsplit("/", 1)[-1]])
+        return None
+
+    @property
+    def avatar_webp_url(self):
+        return self._thumb_url("webp")
+
+    @property
+    def avatar_small_url(self):
+        # JPEG thumbnail, or the original until the thumbnails are built
+        return self._thumb_url("jpg") or (self.avatar.url if self.avatar else None)
     
     
 class Transaction(models.Model):
@@ -48,8 +64,161 @@ class Transaction(models.Model):
     date = models.DateField()
     mode = models.CharField(max_length=50, blank=True, null=True)  # e.g. Cash, Bank
 
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created and not hasattr(instance, 'profile'):
-        Profile.objects.create(user=instance)
 
+class LedgerRollup(models.Model):
+    """Running totals per (user, month, mode, type), maintained by accounts.rollups."""
+    TYPE_CHOICES = (
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_rollups')
+    month = models.DateField()  # first day of the month
+    mode = models.CharField(max_length=50, blank=True)
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'mode', 'type'], name='uniq_ledger_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['month', 'type'], name='ledger_rollup_month_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.type}/{self.mode}: {self.total}"
+
+class ExportJob(models.Model):
+    """A report rendered in the background by the run_export_worker command."""
+    KIND_CHOICES = (
+        ('income_pdf', 'Income PDF'),
+        ('expense_pdf', 'Expense PDF'),
+        ('report_pdf', 'Report PDF'),
+    )
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='export_job_queue'),
+            models.Index(fields=['expires_at'], name='export_job_expiry'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class LedgerTombstone(models.Model):
+    """A deleted Income/Expense row, kept so delta sync clients can drop it."""
+    TYPE_CHOICES = (
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_tombstones')
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'type', 'deleted_at'], name='tombstone_user_type_time'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at'),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    """Balance of one account (mode) at a month end; user=None holds the whole shop's."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='balance_snapshots')
+    mode = models.CharField(max_length=50, blank=True)
+    date = models.DateField()  # last day of the month
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'mode', 'date'], name='uniq_balance_snapshot'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date'], name='balance_snapshot_user_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id or 'shop'} {self.date} {self.mode}: {self.balance}"
+
+
+class ClosedPeriod(models.Model):
+    """A month whose totals are frozen in PeriodTotal (see accounts/closing.py)."""
+    month = models.DateField(unique=True)  # first day of the month
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} closed"
+
+
+class PeriodTotal(models.Model):
+    """Frozen totals of a closed month per (user, type, mode); shop-wide totals are their sum."""
+    TYPE_CHOICES = LedgerRollup.TYPE_CHOICES
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='period_totals')
+    month = models.DateField()
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    mode = models.CharField(max_length=50, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'type', 'mode'], name='uniq_period_total'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id or 'shop'} {self.month:%Y-%m} {self.type}/{self.mode}: {self.total}"
+
+
+class PeriodAdjustment(models.Model):
+    """A change to a closed month, booked beside its frozen PeriodTotal instead of into it."""
+    TYPE_CHOICES = LedgerRollup.TYPE_CHOICES
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='period_adjustments')
+    month = models.DateField()
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    mode = models.CharField(max_length=50, blank=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'month'], name='period_adjustment_user_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.type}/{self.mode}: {self.amount:+}"
+
+
+class LedgerVersion(models.Model):
+    """Current ledger version of one user ("<user id>") or of the whole shop ("shop").
+
+    Read by ETags and the dashboard cache key, written in the same transaction
+    as every ledger write (accounts.ledger_cache), so every process sees it.
+    """
+    scope = models.CharField(max_length=20, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.scope}: {self.version}"
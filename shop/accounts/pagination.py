@@ -0,0 +1,114 @@
+# accounts/pagination.py
+# Shared filtering + keyset (cursor) pagination for the income/expense list APIs.
+from datetime import date
+from operator import attrgetter
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+_model_key = attrgetter("date", "id")
+
+
+def encode_cursor(row_date, pk):
+    return f"{row_date.isoformat()}_{pk}"
+
+
+def decode_cursor(cursor):
+    """Turn "YYYY-MM-DD_<id>" back into (date, id); raises ValueError."""
+    try:
+        d, pk = cursor.split("_", 1)
+        return date.fromisoformat(d), int(pk)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def _parse_amount(raw, name):
+    try:
+        amount = Decimal(raw)
+    except InvalidOperation:
+        raise ValueError(f"Invalid {name}")
+    # Decimal() also parses "NaN" and "Infinity", which the ORM cannot compare against
+    if not amount.is_finite():
+        raise ValueError(f"Invalid {name}")
+    return amount
+
+
+def filter_ledger(qs, params, allowed_modes=None):
+    """Apply the list filters from the querystring; raises ValueError on bad input.
+
+    Supported: date_from, date_to, mode (repeatable), min_amount, max_amount, q.
+    """
+    for key, lookup in (("date_from", "date__gte"), ("date_to", "date__lte")):
+        raw = params.get(key)
+        if raw:
+            d = parse_date(raw)
+            if not d:
+                raise ValueError(f"Invalid {key}")
+            qs = qs.filter(**{lookup: d})
+
+    modes = [m for m in params.getlist("mode") if m]
+    if modes:
+        if allowed_modes is not None and any(m not in allowed_modes for m in modes):
+            raise ValueError("Invalid mode")
+        qs = qs.filter(mode__in=modes)
+
+    if params.get("min_amount"):
+        qs = qs.filter(amount__gte=_parse_amount(params["min_amount"], "min_amount"))
+    if params.get("max_amount"):
+        qs = qs.filter(amount__lte=_parse_amount(params["max_amount"], "max_amount"))
+
+    q = (params.get("q") or "").strip()
+    if q:
+        qs = qs.filter(description__icontains=q)
+    return qs
+
+
+def page_size(params):
+    try:
+        size = int(params.get("limit") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("Invalid limit")
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_queryset(qs, cursor=None):
+    """Order by (-date, -id) and skip everything up to and including `cursor`."""
+    qs = qs.order_by("-date", "-id")
+    if cursor:
+        c_date, c_id = decode_cursor(cursor)
+        # the redundant date__lte gives the index seek an upper bound
+        qs = qs.filter(Q(date__lt=c_date) | Q(id__lt=c_id), date__lte=c_date)
+    return qs
+
+
+def _split_page(rows, limit, key):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*key(rows[-1]))
+    return rows, next_cursor
+
+
+def keyset_page(qs, params, key=_model_key):
+    """Return (rows, next_cursor) for one page ordered by (-date, -id).
+
+    The cursor is the (date, id) of the last row already seen, so each page is
+    a single index range scan instead of an OFFSET over the whole history.
+    `key` reads (date, id) from a row; pass one for values_list() querysets.
+    """
+    limit = page_size(params)
+    qs = keyset_queryset(qs, params.get("cursor"))
+    return _split_page(list(qs[:limit + 1]), limit, key)
+
+
+async def akeyset_page(qs, params, key=_model_key):
+    """keyset_page for async views; the page is read on the ORM thread."""
+    limit = page_size(params)
+    qs = keyset_queryset(qs, params.get("cursor"))
+    # aiterator() runs values_list() queries synchronously in Django 5.2, so fetch the slice in one hop
+    rows = await sync_to_async(list)(qs[:limit + 1])
+    return _split_page(rows, limit, key)
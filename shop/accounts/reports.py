@@ -0,0 +1,281 @@
+# accounts/reports.py
+# Income/expense reports: one filtered, indexed query per section, as a workbook or a PDF.
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import Length
+from django.http import FileResponse
+from django.utils.dateparse import parse_date
+
+from expenses.models import Expense
+from income.models import Income
+
+from .balances import account_modes
+from .exports import (EXPORT_CHUNK_SIZE, LEDGER_HEADERS, SPOOL_MAX_SIZE, XLSX_CONTENT_TYPE,
+                      build_pdf, ledger_pdf_tables)
+
+# type -> the sections it contains, in sheet order
+REPORT_TYPES = {
+    "income": ("income",),
+    "expense": ("expense",),
+    "both": ("income", "expense"),
+}
+# section -> (model, sheet / heading title)
+SECTIONS = {"income": (Income, "Income"), "expense": (Expense, "Expense")}
+PERIODS = ("last_month", "this_month")
+REPORT_TITLES = {"income": "Income Report", "expense": "Expenses Report", "both": "Income & Expense Report"}
+
+
+def _period_dates(period, today):
+    this_month = today.replace(day=1)
+    if period == "this_month":
+        return this_month, today
+    month_end = this_month - timedelta(days=1)
+    return month_end.replace(day=1), month_end
+
+
+def report_spec(params, user, shop_wide=False, today=None, type_=None):
+    """Validate report filters from a querystring into a plain (JSON-storable) dict.
+
+    Supported: type (income|expense|both), period (last_month|this_month) or
+    date_from/date_to, mode (repeatable) and, when shop_wide (owners), user
+    ("all" by default, or a user id). Everyone else only gets their own rows.
+    Raises ValueError on bad input.
+    """
+    type_ = type_ or params.get("type") or "both"
+    if type_ not in REPORT_TYPES:
+        raise ValueError("Invalid type")
+
+    period = params.get("period")
+    if period:
+        if period not in PERIODS:
+            raise ValueError("Invalid period")
+        date_from, date_to = _period_dates(period, today or date.today())
+    else:
+        bounds = []
+        for key in ("date_from", "date_to"):
+            raw = params.get(key)
+            d = parse_date(raw) if raw else None
+            if raw and not d:
+                raise ValueError(f"Invalid {key}")
+            bounds.append(d)
+        date_from, date_to = bounds
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("'date_from' is after 'date_to'")
+
+    modes = [m for m in params.getlist("mode") if m]
+    allowed = {key for key, _ in account_modes()}
+    if any(m not in allowed for m in modes):
+        raise ValueError("Invalid mode")
+
+    user_id = user.id
+    if shop_wide:
+        scope = params.get("user") or "all"
+        if scope == "all":
+            user_id = None
+        elif not scope.isdigit() or not User.objects.filter(id=int(scope)).exists():
+            raise ValueError("Invalid user")
+        else:
+            user_id = int(scope)
+
+    return {
+        "type": type_,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "modes": modes,
+        "user_id": user_id,
+    }
+
+
+def section_queryset(kind, spec):
+    """The section's rows in (date, id) order, as (date, user_id, description, mode, amount).
+
+    Every filter is on the ledger table itself, so SQLite walks (user, date, id)
+    for one user and (date, id) for the shop, starting at date_from.
+    """
+    model = SECTIONS[kind][0]
+    qs = model.objects.all() if spec["user_id"] is None else model.objects.filter(user_id=spec["user_id"])
+    if spec["date_from"]:
+        qs = qs.filter(date__gte=spec["date_from"])
+    if spec["date_to"]:
+        qs = qs.filter(date__lte=spec["date_to"])
+    if spec["modes"]:
+        qs = qs.filter(mode__in=spec["modes"])
+    return qs.order_by("date", "id").values_list("date", "user_id", "description", "mode", "amount")
+
+
+class _Report:
+    """Streams the sections of one spec and keeps the per-mode totals for the summary."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.kinds = REPORT_TYPES[spec["type"]]
+        self.shop_wide = spec["user_id"] is None
+        self.headers = LEDGER_HEADERS[:1] + ["User"] * self.shop_wide + LEDGER_HEADERS[1:]
+        self.totals = {}  # (kind, mode) -> [amount, count]
+        self._names = None
+
+    @property
+    def names(self):
+        if self._names is None:
+            self._names = dict(User.objects.values_list("id", "username"))
+        return self._names
+
+    def username(self, user_id):
+        return self.names.get(user_id, f"#{user_id}")
+
+    def column_widths(self, kind):
+        """Widths for a section's columns from one aggregate query, before any row is written.
+
+        Write-only worksheets emit <cols> ahead of the first row, so the widths
+        have to be known up front instead of re-scanning the written cells.
+        """
+        agg = section_queryset(kind, self.spec).order_by().aggregate(
+            desc_len=Max(Length("description")),
+            mode_len=Max(Length("mode")),
+            max_amount=Max("amount"),
+            min_amount=Min("amount"),
+            total=Sum("amount"),
+        )
+        amounts = [agg["max_amount"], agg["min_amount"], agg["total"]]
+        lengths = {
+            "Date": len("01-Jan-2000"),
+            "User": max(map(len, self.names.values()), default=0),
+            "Description": agg["desc_len"] or 0,
+            "Mode": max(agg["mode_len"] or 0, len("Total")),
+            "Amount (₹)": max((len(str(float(a))) for a in amounts if a is not None), default=0),
+        }
+        return [max(len(h), lengths[h]) + 2 for h in self.headers]
+
+    def rows(self, kind):
+        """Formatted rows of one section: date text, [username,] description, mode, amount."""
+        for d, user_id, description, mode, amount in \
+                section_queryset(kind, self.spec).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            entry = self.totals.setdefault((kind, mode), [Decimal(0), 0])
+            entry[0] += amount
+            entry[1] += 1
+            row = [d.strftime("%d-%b-%Y"), description, mode, amount]
+            if self.shop_wide:
+                row.insert(1, self.username(user_id))
+            yield row
+
+    @property
+    def title(self):
+        return REPORT_TITLES[self.spec["type"]]
+
+    def subtitle(self):
+        first, last = self.spec["date_from"], self.spec["date_to"]
+        period = f"{first or 'Beginning'} – {last or 'today'}"
+        scope = "Whole shop" if self.shop_wide else self.username(self.spec["user_id"])
+        modes = ", ".join(self.spec["modes"]) or "all modes"
+        return f"{period} · {scope} · {modes}"
+
+    def summary(self):
+        """Header and rows of the summary table: one row per mode plus a Total row (call last)."""
+        titles = [SECTIONS[kind][1] for kind in self.kinds]
+        header = ["Mode"] + titles + ["Net"] * (len(self.kinds) == 2) + ["Entries"]
+        labels = dict(account_modes())
+        used = {mode for _, mode in self.totals}
+        order = [m for m in labels if m in used] + sorted(used - set(labels), key=str)
+        rows, grand = [], [Decimal(0)] * len(self.kinds) + [0]
+        for mode in order:
+            amounts = [self.totals.get((kind, mode), [Decimal(0), 0])[0] for kind in self.kinds]
+            count = sum(self.totals.get((kind, mode), [0, 0])[1] for kind in self.kinds)
+            rows.append(self._summary_row(labels.get(mode, mode or "-"), amounts, count))
+            grand = [g + a for g, a in zip(grand, amounts + [count])]
+        rows.append(self._summary_row("Total", grand[:-1], grand[-1]))
+        return header, rows
+
+    def _summary_row(self, label, amounts, count):
+        net = [amounts[0] - amounts[1]] if len(amounts) == 2 else []
+        return [label] + amounts + net + [count]
+
+
+def write_report_xlsx(spec, out):
+    """Income/Expense sheets (as the spec asks) and a Summary sheet, written row by row."""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    report = _Report(spec)
+    wb = Workbook(write_only=True)
+    for kind in report.kinds:
+        ws = wb.create_sheet(SECTIONS[kind][1])
+        for col_idx, width in enumerate(report.column_widths(kind), start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        ws.append(report.headers)
+        total = 0
+        for row in report.rows(kind):
+            row[-1] = float(row[-1])
+            total += row[-1]
+            ws.append(row)
+        ws.append([""] * (len(report.headers) - 2) + ["Total", total])
+
+    # the sections are read by now, so the summary's widths come from its own cells
+    header, rows = report.summary()
+    rows = [[float(v) if isinstance(v, Decimal) else v for v in row] for row in rows]
+    ws = wb.create_sheet("Summary")
+    for col_idx, cells in enumerate(zip(header, *rows), start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = max(len(str(v)) for v in cells) + 2
+    ws.append([report.title])
+    ws.append([report.subtitle()])
+    ws.append([])
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(out)
+
+
+def report_filename(spec, ext):
+    return f"report_{spec['type']}_{spec['date_from'] or 'start'}_{spec['date_to'] or date.today().isoformat()}.{ext}"
+
+
+def report_xlsx_response(spec):
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    write_report_xlsx(spec, out)
+    out.seek(0)
+    return FileResponse(out, as_attachment=True, filename=report_filename(spec, "xlsx"),
+                        content_type=XLSX_CONTENT_TYPE)
+
+
+def render_report_pdf(spec, out, progress=None):
+    """The workbook's content as a PDF: a table per section, then the summary.
+
+    progress(percent) is called after each section is read (0-60) and while
+    pages are built (60-100).
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import inch
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+    progress = progress or (lambda pct: None)
+    report = _Report(spec)
+    styles = getSampleStyleSheet()
+    story = [Paragraph(report.title, styles["Title"]), Paragraph(report.subtitle(), styles["Normal"]),
+             Spacer(1, 0.2 * inch)]
+    if report.shop_wide:
+        col_widths = [1.1*inch, 1.1*inch, 2.6*inch, 1.0*inch, 1.2*inch]
+    else:
+        col_widths = [1.3*inch, 3.2*inch, 1.2*inch, 1.3*inch]
+    for n, kind in enumerate(report.kinds, start=1):
+        story.append(Paragraph(SECTIONS[kind][1], styles["Heading2"]))
+        tables, _ = ledger_pdf_tables(report.rows(kind), report.headers, col_widths)
+        story += tables
+        progress(60 * n // (len(report.kinds) + 1))
+
+    header, rows = report.summary()
+    data = [header] + [[f"{v:.2f}" if isinstance(v, Decimal) else v for v in row] for row in rows]
+    summary = Table(data, colWidths=[1.4*inch] + [1.3*inch] * (len(header) - 1))
+    summary.setStyle(TableStyle([
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+    ]))
+    story += [Paragraph("Summary", styles["Heading2"]), summary]
+    progress(60)
+    build_pdf(story, out, progress, start=60)
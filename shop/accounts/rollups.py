@@ -0,0 +1,120 @@
+# accounts/rollups.py
+# Incrementally maintained (user, month, mode, type) totals for the dashboard.
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date
+
+from .balances import invalidate_snapshots
+from .closing import check_open, record_adjustment
+from .ledger_cache import bump_ledger_version
+from .models import BalanceSnapshot, LedgerRollup
+
+
+def _as_date(value):
+    # API views sometimes assign the raw "YYYY-MM-DD" string before save()
+    if isinstance(value, str):
+        return parse_date(value)
+    return value
+
+
+def _as_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value or 0))
+
+
+def apply_delta(user_id, type_, row_date, mode, amount, count, adjust=True, bump=True):
+    """Add amount/count to one rollup row, creating it for positive deltas only.
+
+    A missing row on a negative delta means the table is already out of sync
+    (or the user is being deleted); `rebuild_rollups` is the fix for that.
+    Deltas to a closed month are also booked as a PeriodAdjustment unless
+    adjust=False (the user is being deleted along with their rows). The
+    ledger version is bumped after the totals, in the same transaction, so
+    no reader can see the new version with the old totals (bump=False leaves
+    that to the caller).
+    """
+    row_date = _as_date(row_date)
+    if row_date is None:
+        return
+    key = dict(user_id=user_id, month=row_date.replace(day=1), mode=mode or '', type=type_)
+    amount = _as_decimal(amount)
+
+    with transaction.atomic():
+        invalidate_snapshots(user_id, row_date)
+        if adjust:
+            record_adjustment(user_id, type_, key['month'], key['mode'], amount, count)
+        updated = LedgerRollup.objects.filter(**key).update(
+            total=F('total') + amount, count=F('count') + count
+        )
+        if not updated and count > 0:
+            try:
+                with transaction.atomic():
+                    LedgerRollup.objects.create(total=amount, count=count, **key)
+            except IntegrityError:
+                # another writer created the row first
+                LedgerRollup.objects.filter(**key).update(
+                    total=F('total') + amount, count=F('count') + count
+                )
+        if bump:
+            bump_ledger_version(user_id)
+
+
+def add_rows(type_, rows):
+    """Fold many (user_id, date, mode, amount, count) deltas into the rollups.
+
+    Used by bulk paths (bulk_create etc.) that bypass model signals. Every
+    user in `rows` gets a new ledger version even when their deltas net to
+    zero, so cached dashboards and ETags drop rows whose text changed.
+    """
+    rows = [(user_id, _as_date(row_date), mode, amount, count)
+            for user_id, row_date, mode, amount, count in rows]
+    # callers run inside a transaction, so this undoes their bulk write too
+    check_open(*(r[1] for r in rows))
+    grouped = {}
+    for user_id, row_date, mode, amount, count in rows:
+        key = (user_id, row_date.replace(day=1), mode or '')
+        total, n = grouped.get(key, (Decimal('0'), 0))
+        grouped[key] = (total + _as_decimal(amount), n + count)
+    with transaction.atomic():
+        for (user_id, month, mode), (total, n) in grouped.items():
+            if n or total:
+                apply_delta(user_id, type_, month, mode, total, n, bump=False)
+        # once per user, after all of their totals
+        for user_id in {r[0] for r in rows}:
+            bump_ledger_version(user_id)
+
+
+def _aggregate(model, type_):
+    qs = (model.objects
+          .annotate(month=TruncMonth('date'))
+          .values('user_id', 'month', 'mode')
+          .annotate(total=Sum('amount'), count=Count('id'))
+          .order_by())
+    for r in qs.iterator():
+        month = r['month'].date() if hasattr(r['month'], 'date') else r['month']
+        yield LedgerRollup(user_id=r['user_id'], month=month, mode=r['mode'] or '',
+                           type=type_, total=r['total'] or 0, count=r['count'])
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """Recompute every rollup row from the Income and Expense tables."""
+    from expenses.models import Expense
+    from income.models import Income
+
+    # users whose rows are all gone lose their rollups, and need a new version too
+    user_ids = set(LedgerRollup.objects.values_list('user_id', flat=True).distinct().order_by())
+    LedgerRollup.objects.all().delete()
+    # snapshots are summed from the rollups; take_snapshots() writes them again
+    BalanceSnapshot.objects.all().delete()
+    created = 0
+    for model, type_ in ((Income, 'income'), (Expense, 'expense')):
+        objs = list(_aggregate(model, type_))
+        LedgerRollup.objects.bulk_create(objs, batch_size=1000)
+        created += len(objs)
+    user_ids.update(LedgerRollup.objects.values_list('user_id', flat=True).distinct().order_by())
+    for user_id in user_ids:
+        bump_ledger_version(user_id)
+    return created
@@ -5,15 +5,73 @@ from .models import Profile
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
+    # the only profile receiver: later saves (e.g. login() updating last_login) write nothing
     if created:
-        Profile.objects.create(user=instance, email=instance.email, name=instance.get_full_name() or instance.username)
-    else:
-        # ensure profile exists and save on updates
-        if hasattr(instance, 'profile'):
-            instance.profile.save()
-        else:
-            Profile.objects.create(user=instance)
+        Profile.objects.get_or_create(
+            user=instance,
+            defaults={"email": instance.email, "name": instance.get_full_name() or instance.username},
+        )
 
-@receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
+
+# ---------- ledger rollups ----------
+from django.db.models.signals import pre_save, post_delete, pre_delete
+from expenses.models import Expense
+from income.models import Income
+from .closing import check_open
+from .rollups import _as_date, apply_delta
+
+LEDGER_TYPES = {Income: 'income', Expense: 'expense'}
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+def remember_ledger_row(sender, instance, **kwargs):
+    # keep the stored values so post_save can move the amount between rollups
+    instance._rollup_old = None
+    if instance.pk:
+        instance._rollup_old = (sender.objects.filter(pk=instance.pk)
+                                .values_list('user_id', 'date', 'mode', 'amount').first())
+    # with CLOSED_PERIOD_POLICY = "block", neither the old nor the new date may be closed
+    check_open(_as_date(instance.date), instance._rollup_old and instance._rollup_old[1])
+
+
+# these run in the writer's transaction only if it has one: the API views wrap
+# save()/delete() in atomic(), so a failed rollup update rolls the row back too
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    type_ = LEDGER_TYPES[sender]
+    old = getattr(instance, '_rollup_old', None)
+    if old:
+        user_id, old_date, old_mode, old_amount = old
+        apply_delta(user_id, type_, old_date, old_mode, -old_amount, -1)
+    apply_delta(instance.user_id, type_, instance.date, instance.mode, instance.amount, 1)
+
+
+@receiver(pre_delete, sender=Income)
+@receiver(pre_delete, sender=Expense)
+def check_delete_period(sender, instance, origin=None, **kwargs):
+    # deleting a user takes their rows with them, closed months included
+    if not isinstance(origin, User):
+        check_open(_as_date(instance.date))
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    apply_delta(instance.user_id, LEDGER_TYPES[sender], instance.date, instance.mode, -instance.amount, -1,
+                adjust=not isinstance(origin, User))
+
+
+# ---------- delta sync tombstones ----------
+from .sync import record_deletion
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def record_ledger_tombstone(sender, instance, origin=None, **kwargs):
+    # the whole user is going away (cascade): nobody is left to sync, and a new
+    # tombstone would point at the user row being deleted
+    if isinstance(origin, User):
+        return
+    record_deletion(LEDGER_TYPES[sender], instance.user_id, instance.id)
@@ -0,0 +1,247 @@
+# accounts/statements.py
+# Stream-parse bank statement exports (CSV/XLSX) into Income and Expense rows.
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from expenses.models import Expense
+from income.models import Income, MODE_CHOICES
+from .closing import closed_through, policy
+from .rollups import add_rows
+from .writer import ledger_write
+
+IMPORT_CHUNK_SIZE = 1000
+# statements carry a preamble (account no., branch, period...) above the real header
+HEADER_SEARCH_ROWS = 40
+MAX_REPORTED_ERRORS = 20
+
+# normalised header text -> column role; the first matching prefix wins
+COLUMN_ALIASES = (
+    ("date", ("txn date", "transaction date", "tran date", "value date", "date")),
+    ("description", ("narration", "description", "particulars", "transaction remarks",
+                     "remarks", "details")),
+    ("direction", ("cr dr", "dr cr", "debit credit", "credit debit", "type")),
+    ("debit", ("withdrawal", "debit", "dr")),
+    ("credit", ("deposit", "credit", "cr")),
+    ("amount", ("amount",)),
+    ("mode", ("mode",)),
+)
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d-%m-%y", "%d-%b-%Y", "%d-%b-%y",
+                "%d %b %Y", "%d %b %y", "%d.%m.%Y", "%Y-%m-%d")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_NOT_NUMBER = re.compile(r"[^0-9.\-]")
+
+
+class StatementError(ValueError):
+    pass
+
+
+def _norm(value):
+    return _NON_WORD.sub(" ", str(value or "").lower()).strip()
+
+
+def statement_modes():
+    # the income and expense apps list the same accounts
+    return {key for key, _ in MODE_CHOICES} & {key for key, _ in Expense.MODE_CHOICES}
+
+
+def mode_from_name(name):
+    """Guess the account from a file name like "ICICI_Statement_Apr.xlsx"."""
+    words = set(_norm(name).split())
+    matches = [m for m in statement_modes() if m in words]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _header_map(row):
+    columns = {}
+    for idx, cell in enumerate(row):
+        text = _norm(cell)
+        if not text:
+            continue
+        for role, aliases in COLUMN_ALIASES:
+            if role not in columns and any(text == a or text.startswith(a + " ") for a in aliases):
+                columns[role] = idx
+                break
+    if "date" in columns and "description" in columns and (
+            "amount" in columns or "debit" in columns or "credit" in columns):
+        return columns
+    return None
+
+
+def parse_date_cell(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount_cell(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = _NOT_NUMBER.sub("", str(value))
+    if text in ("", "-", "."):
+        return None
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        return None
+
+
+def _iter_csv(fileobj):
+    text = fileobj if isinstance(fileobj, io.TextIOBase) else io.TextIOWrapper(
+        fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    for row in csv.reader(text):
+        yield row
+
+
+def _iter_xlsx(fileobj):
+    from openpyxl import load_workbook
+
+    # read-only mode parses the sheet XML lazily, one row at a time
+    try:
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise StatementError("Not a readable .xlsx file")
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def statement_rows(fileobj, filename):
+    """Yield the raw rows of a statement file, picking the reader by extension."""
+    name = (filename or "").lower()
+    if name.endswith((".xlsx", ".xlsm")):
+        return _iter_xlsx(fileobj)
+    if name.endswith((".csv", ".txt")):
+        return _iter_csv(fileobj)
+    raise StatementError("Only .csv and .xlsx statements are supported")
+
+
+def parse_statement(rows, mode=None):
+    """Yield ("income"|"expense", date, description, mode, amount) or ("skip", line_no, reason).
+
+    Rows before the first recognisable header are ignored, as are opening
+    balance and footer lines without a date. Withdrawals become expenses,
+    deposits become income.
+    """
+    modes = statement_modes()
+    columns = None
+    for line_no, row in enumerate(rows, start=1):
+        row = list(row or ())
+        if columns is None:
+            columns = _header_map(row)
+            if columns is None and line_no >= HEADER_SEARCH_ROWS:
+                raise StatementError("Could not find the statement header row")
+            continue
+
+        def cell(role):
+            idx = columns.get(role)
+            return row[idx] if idx is not None and idx < len(row) else None
+
+        row_date = parse_date_cell(cell("date"))
+        if row_date is None:
+            if any(v not in (None, "") for v in row):
+                yield "skip", line_no, "no date"
+            continue
+        description = str(cell("description") or "").strip()[:255] or "Statement entry"
+
+        debit, credit = parse_amount_cell(cell("debit")), parse_amount_cell(cell("credit"))
+        if not debit and not credit:
+            amount = parse_amount_cell(cell("amount"))
+            direction = _norm(cell("direction"))
+            if amount and (direction.startswith(("dr", "debit", "withdrawal")) or amount < 0):
+                debit = abs(amount)
+            elif amount:
+                credit = amount
+        if debit and credit:
+            yield "skip", line_no, "both debit and credit"
+            continue
+        if not debit and not credit:
+            yield "skip", line_no, "no amount"
+            continue
+
+        row_mode = _norm(cell("mode")).replace(" ", "_") or mode
+        if row_mode not in modes:
+            yield "skip", line_no, "unknown mode"
+            continue
+        if debit:
+            yield "expense", row_date, description, row_mode, abs(debit)
+        else:
+            yield "income", row_date, description, row_mode, abs(credit)
+    if columns is None:
+        raise StatementError("Could not find the statement header row")
+
+
+def iter_import(user, rows, mode=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Insert a parsed statement for `user` in bulk_create chunks, yielding stats after each.
+
+    Only one chunk of model instances is held at a time, so memory stays flat
+    however long the statement is. Each chunk commits on its own.
+    """
+    if mode is not None and mode not in statement_modes():
+        raise StatementError("Invalid mode")
+    models = {"income": Income, "expense": Expense}
+    stats = {"lines": 0, "income": 0, "expense": 0, "skipped": 0, "errors": []}
+    pending = {"income": [], "expense": []}
+    # lines dated in a closed month are skipped rather than failing a whole chunk
+    blocked_through = closed_through() if policy() == "block" else None
+
+    @transaction.atomic
+    def write_chunk():
+        for type_, objs in pending.items():
+            if not objs:
+                continue
+            models[type_].objects.bulk_create(objs)
+            # bulk_create skips the rollup signals
+            add_rows(type_, [(user.id, o.date, o.mode, o.amount, 1) for o in objs])
+            stats[type_] += len(objs)
+            objs.clear()
+
+    def flush():
+        ledger_write(write_chunk)
+
+    for entry in parse_statement(rows, mode):
+        stats["lines"] += 1
+        if entry[0] == "skip":
+            stats["skipped"] += 1
+            if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                stats["errors"].append(f"line {entry[1]}: {entry[2]}")
+            continue
+        type_, row_date, description, row_mode, amount = entry
+        if blocked_through and row_date.replace(day=1) <= blocked_through:
+            stats["skipped"] += 1
+            if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                stats["errors"].append(f"{row_date}: {row_date:%B %Y} is closed")
+            continue
+        pending[type_].append(models[type_](
+            user=user, date=row_date, description=description, mode=row_mode, amount=amount))
+        if len(pending["income"]) + len(pending["expense"]) >= chunk_size:
+            flush()
+            yield stats
+    flush()
+    yield stats
+
+
+def import_statement(user, rows, mode=None, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """Run iter_import to the end, calling progress(stats) after every chunk."""
+    stats = None
+    for stats in iter_import(user, rows, mode, chunk_size):
+        if progress:
+            progress(stats)
+    return stats
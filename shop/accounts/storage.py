@@ -0,0 +1,99 @@
+# accounts/storage.py
+# collectstatic storage: minify the project's own CSS/JS, fingerprint everything, precompress.
+import gzip
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# project files only (STATICFILES_DIRS); third-party files such as admin/ are copied as they are
+MINIFY_PREFIXES = ("css/", "js/")
+COMPRESS_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".map", ".html", ".xml")
+# a compressed copy has to save at least this much to be worth a second file
+MIN_SAVING = 0.05
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(text):
+    text = _CSS_COMMENT.sub("", text)
+    text = _CSS_SPACE.sub(" ", text)
+    text = _CSS_PUNCT.sub(r"\1", text)
+    return text.replace(";}", "}").replace(": ", ":").strip() + "\n"
+
+
+def minify_js(text):
+    """Whitespace and comment-line minification; lines stay lines, so ASI is untouched.
+
+    Lines inside a multi-line template literal are kept byte for byte.
+    """
+    out, in_template, in_comment = [], False, False
+    for line in text.splitlines():
+        if in_template:
+            out.append(line)
+        else:
+            stripped = line.strip()
+            if in_comment:
+                in_comment = "*/" not in stripped
+                continue
+            if stripped.startswith("/*"):
+                in_comment = "*/" not in stripped
+                continue
+            if not stripped or stripped.startswith("//"):
+                continue
+            out.append(stripped)
+            line = stripped
+        if len(re.findall(r"(?<!\\)`", line)) % 2:
+            in_template = not in_template
+    return "\n".join(out) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that minifies before hashing and writes .gz/.br next to each
+    hashed file, for a web server (or accounts.views.static_asset) to send as is."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in paths:
+                if self._minify(name):
+                    # hash (and copy) the minified file in STATIC_ROOT, not the source
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if not dry_run:
+            for name in set(self.hashed_files.values()):
+                self._compress(name)
+
+    def _minify(self, name):
+        minifier = MINIFIERS.get(name[name.rfind("."):])
+        if minifier is None or not name.startswith(MINIFY_PREFIXES) or ".min." in name:
+            return False
+        with self.open(name) as f:
+            text = f.read().decode("utf-8")
+        self.delete(name)
+        self._save(name, ContentFile(minifier(text).encode("utf-8")))
+        return True
+
+    def _compress(self, name):
+        if not name.endswith(COMPRESS_EXTENSIONS) or not self.exists(name):
+            return
+        with self.open(name) as f:
+            data = f.read()
+        encoders = [("gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(("br", lambda d: brotli.compress(d, quality=11)))
+        for ext, encode in encoders:
+            packed = encode(data)
+            if len(packed) <= len(data) * (1 - MIN_SAVING):
+                if self.exists(f"{name}.{ext}"):
+                    self.delete(f"{name}.{ext}")
+                self._save(f"{name}.{ext}", ContentFile(packed))
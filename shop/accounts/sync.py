@@ -0,0 +1,74 @@
+# accounts/sync.py
+# Delta sync for the ledger lists: rows changed since a cursor, plus tombstones.
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import LedgerTombstone
+from .pagination import filter_ledger
+from .serialization import ledger_values
+
+SYNC_MAX_CHANGES = 500
+# timestamps are taken before commit, so a slow writer can land "in the past";
+# cursors trail the clock and clients upsert by id, so re-sent rows are harmless
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def sync_cursor(now=None):
+    return ((now or timezone.now()) - SYNC_OVERLAP).isoformat()
+
+
+def decode_since(value):
+    since = parse_datetime(value or "")
+    if since is None or timezone.is_naive(since):
+        raise ValueError("Invalid since")
+    return since
+
+
+def _retention():
+    return timedelta(days=getattr(settings, "SYNC_TOMBSTONE_DAYS", 30))
+
+
+def ledger_changes(model, type_, user, params, allowed_modes=None):
+    """Rows of `model` changed since params["since"], filtered like the list API.
+
+    Returns {"changed": [ledger_values() tuples], "removed": [ids], "since": next_cursor}, or
+    {"reset": True, "since": next_cursor} when the client should reload its
+    page instead: the cursor predates the kept tombstones, or too much changed.
+    Rows edited so they no longer match the filters come back in "removed".
+    """
+    since = decode_since(params.get("since"))
+    now = timezone.now()
+    next_cursor = sync_cursor(now)
+    if since < now - _retention():
+        return {"reset": True, "since": next_cursor}
+
+    touched = list(ledger_values(model.objects.filter(user=user, updated_at__gt=since))
+                   .order_by("updated_at")[:SYNC_MAX_CHANGES + 1])
+    removed = list(LedgerTombstone.objects.filter(user=user, type=type_, deleted_at__gt=since)
+                   .values_list("object_id", flat=True)[:SYNC_MAX_CHANGES + 1])
+    if len(touched) + len(removed) > SYNC_MAX_CHANGES:
+        return {"reset": True, "since": next_cursor}
+
+    matching = set()
+    if touched:
+        ids = [row[0] for row in touched]
+        matching = set(filter_ledger(model.objects.filter(user=user, id__in=ids), params, allowed_modes)
+                       .values_list("id", flat=True))
+    return {
+        "changed": [row for row in touched if row[0] in matching],
+        "removed": removed + [row[0] for row in touched if row[0] not in matching],
+        "since": next_cursor,
+    }
+
+
+def record_deletion(type_, user_id, object_id):
+    LedgerTombstone.objects.create(type=type_, user_id=user_id, object_id=object_id)
+
+
+def purge_tombstones():
+    """Drop tombstones older than SYNC_TOMBSTONE_DAYS; clients that old get reset=True."""
+    deleted, _ = LedgerTombstone.objects.filter(deleted_at__lt=timezone.now() - _retention()).delete()
+    return deleted
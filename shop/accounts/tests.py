@@ -1,3 +1,695 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from expenses.models import Expense
+from income.models import Income
+
+from . import avatars, rollups, worker
+from .activity import activity_page, decode_feed_cursor
+from .avatars import CACHE_FOREVER, THUMB_SIZE, build_thumbnails, pending_profiles, render_thumbnails
+from .balances import running_balances, take_snapshots
+from .closing import ClosedPeriodError, close_months, ledger_totals, merge_totals
+from .jobs import claim_next_job, enqueue_export, purge_expired_jobs, requeue_interrupted_jobs
+from .ledger_cache import ledger_version
+from .management.commands.check_query_plans import hot_queries, plan_problems, query_plans
+from .models import BalanceSnapshot, ExportJob, LedgerRollup, PeriodAdjustment, PeriodTotal
+from .pagination import decode_cursor, encode_cursor, filter_ledger, keyset_page
+from .search import search_ledger
+from .statements import (StatementError, iter_import, mode_from_name, parse_amount_cell, parse_date_cell,
+                         statement_rows)
+from .storage import minify_css, minify_js
+from .views import static_asset
+
+
+def _expense(user, day, amount, mode="cash", description="tea"):
+    return Expense.objects.create(user=user, date=day, description=description, mode=mode, amount=Decimal(amount))
+
+
+def _totals(user_id=None):
+    # {(type, mode): (total, count)} from the closed + open figures
+    return {(r["type"], r["mode"]): (r["total"], r["count"]) for r in merge_totals(ledger_totals(user_id))}
+
+
+def _temp_media(test):
+    # files written by the test go to a throwaway MEDIA_ROOT
+    media = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media, ignore_errors=True)
+    settings = override_settings(MEDIA_ROOT=media)
+    settings.enable()
+    test.addCleanup(settings.disable)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+
+    def test_pages_cover_every_row_once_in_date_order(self):
+        days = [date(2026, 1, 3), date(2026, 1, 1), date(2026, 1, 3), date(2026, 1, 2), date(2026, 1, 3)]
+        rows = [_expense(self.user, d, "10.00") for d in days]
+        expected = [e.id for e in sorted(rows, key=lambda e: (e.date, e.id), reverse=True)]
+
+        seen, cursor = [], None
+        while True:
+            params = QueryDict(mutable=True)
+            params["limit"] = "2"
+            if cursor:
+                params["cursor"] = cursor
+            page, cursor = keyset_page(Expense.objects.filter(user=self.user), params)
+            seen += [e.id for e in page]
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(date(2026, 2, 1), 42)), (date(2026, 2, 1), 42))
+        for bad in ("", "2026-02-01", "yesterday_1", "2026-02-01_x"):
+            with self.assertRaises(ValueError):
+                decode_cursor(bad)
+
+    def test_filters(self):
+        _expense(self.user, date(2026, 1, 1), "5.00", description="Morning tea")
+        _expense(self.user, date(2026, 1, 2), "50.00", mode="sbi", description="Rent")
+        qs = Expense.objects.filter(user=self.user)
+        self.assertEqual(filter_ledger(qs, QueryDict("min_amount=10")).count(), 1)
+        self.assertEqual(filter_ledger(qs, QueryDict("mode=cash&q=TEA")).count(), 1)
+        self.assertEqual(filter_ledger(qs, QueryDict("date_from=2026-01-02&date_to=2026-01-31")).count(), 1)
+
+    def test_rejects_bad_filters(self):
+        qs = Expense.objects.filter(user=self.user)
+        for query in ("min_amount=NaN", "max_amount=Infinity", "min_amount=-inf", "min_amount=abc",
+                      "date_from=2026-13-01", "mode=bitcoin"):
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                filter_ledger(qs, QueryDict(query), allowed_modes=["cash", "sbi"])
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+
+    def rollup(self, month, mode, type_="expense"):
+        row = LedgerRollup.objects.filter(user=self.user, month=month, mode=mode, type=type_).first()
+        return (row.total, row.count) if row else None
+
+    def test_rollups_follow_saves_and_deletes(self):
+        jan, feb = date(2026, 1, 1), date(2026, 2, 1)
+        first = _expense(self.user, date(2026, 1, 5), "100.00")
+        _expense(self.user, date(2026, 1, 9), "50.00")
+        Income.objects.create(user=self.user, date=date(2026, 1, 9), description="Sale", mode="cash",
+                              amount=Decimal("70.00"))
+        self.assertEqual(self.rollup(jan, "cash"), (Decimal("150.00"), 2))
+        self.assertEqual(self.rollup(jan, "cash", "income"), (Decimal("70.00"), 1))
+
+        # moving a row to another month and mode takes its amount with it
+        first.date, first.mode, first.amount = date(2026, 2, 1), "sbi", Decimal("120.00")
+        first.save()
+        self.assertEqual(self.rollup(jan, "cash"), (Decimal("50.00"), 1))
+        self.assertEqual(self.rollup(feb, "sbi"), (Decimal("120.00"), 1))
+
+        first.delete()
+        self.assertEqual(self.rollup(feb, "sbi"), (Decimal("0.00"), 0))
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+        _expense(self.user, date(2026, 1, 5), "100.00")
+        _expense(self.user, date(2026, 3, 5), "7.25", mode="sbi")
+        before = set(LedgerRollup.objects.filter(count__gt=0).values_list("month", "mode", "type", "total", "count"))
+        LedgerRollup.objects.all().delete()
+        call_command("rebuild_rollups", stdout=StringIO())
+        after = set(LedgerRollup.objects.values_list("month", "mode", "type", "total", "count"))
+        self.assertEqual(after, before)
+
+
+class ClosingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+
+    def test_close_freezes_totals_and_books_later_edits(self):
+        row = _expense(self.user, date(2026, 1, 5), "100.00")
+        _expense(self.user, date(2026, 2, 5), "30.00")
+        self.assertEqual(close_months(date(2026, 1, 20)), [date(2026, 1, 1)])
+        self.assertEqual(PeriodTotal.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(close_months(date(2026, 1, 1)), [])
+
+        # "adjust" (the default): the closed month keeps its total, the edit is booked beside it
+        row.amount = Decimal("80.00")
+        row.save()
+        adjustments = PeriodAdjustment.objects.filter(user=self.user)
+        self.assertEqual(set(adjustments.values_list("month", flat=True)), {date(2026, 1, 1)})
+        self.assertEqual(sum(a.amount for a in adjustments), Decimal("-20.00"))
+        self.assertEqual(_totals(self.user.id)[("expense", "cash")], (Decimal("110.00"), 2))
+
+    @override_settings(CLOSED_PERIOD_POLICY="block")
+    def test_block_policy_rejects_writes_to_closed_months(self):
+        row = _expense(self.user, date(2026, 1, 5), "100.00")
+        close_months(date(2026, 1, 1))
+        # (each write is wrapped so the failed one does not break the test's transaction)
+        with self.assertRaises(ClosedPeriodError), transaction.atomic():
+            _expense(self.user, date(2026, 1, 6), "5.00")
+        with self.assertRaises(ClosedPeriodError), transaction.atomic():
+            row.delete()
+        # moving a row out of a closed month is an edit of that month too
+        row.date = date(2026, 2, 1)
+        with self.assertRaises(ClosedPeriodError), transaction.atomic():
+            row.save()
+        _expense(self.user, date(2026, 2, 1), "5.00")
+
+    def test_shop_totals_are_the_sum_over_users(self):
+        _expense(self.user, date(2026, 1, 5), "100.00")
+        _expense(self.other, date(2026, 1, 6), "40.00")
+        _expense(self.other, date(2026, 2, 6), "2.00")
+        close_months(date(2026, 1, 1))
+        self.assertEqual(_totals()[("expense", "cash")], (Decimal("142.00"), 3))
+
+        # a deleted user's closed months leave the shop figures with them
+        self.other.delete()
+        self.assertEqual(_totals(), _totals(self.user.id))
+        self.assertEqual(_totals()[("expense", "cash")], (Decimal("100.00"), 1))
+
+
+class BalanceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+        for day, amount in ((date(2026, 1, 5), "100.00"), (date(2026, 2, 10), "50.00"), (date(2026, 3, 2), "20.00")):
+            Income.objects.create(user=self.user, date=day, description="sale", mode="cash", amount=Decimal(amount))
+        _expense(self.user, date(2026, 2, 12), "30.00")
+        _expense(self.user, date(2026, 3, 3), "5.00", mode="sbi")
+        _expense(self.other, date(2026, 3, 3), "7.00")
+
+    def test_running_balance_per_account(self):
+        result = running_balances(self.user, date(2026, 2, 1), date(2026, 3, 31))
+        self.assertEqual(result["opening"], {"cash": Decimal("100.00")})
+        self.assertEqual(result["closing"], {"cash": Decimal("140.00"), "sbi": Decimal("-5.00")})
+        self.assertEqual([(r["date"], r["mode"], r["balance"]) for r in result["days"]], [
+            (date(2026, 2, 10), "cash", Decimal("150.00")),
+            (date(2026, 2, 12), "cash", Decimal("120.00")),
+            (date(2026, 3, 2), "cash", Decimal("140.00")),
+            (date(2026, 3, 3), "sbi", Decimal("-5.00")),
+        ])
+        self.assertEqual(running_balances(None, date(2026, 3, 1), date(2026, 3, 31))["closing"]["cash"],
+                         Decimal("133.00"))
+
+    def test_snapshots_give_the_same_balances(self):
+        scopes = [(self.user, date(2026, 2, 15)), (self.user, date(2026, 3, 3)), (None, date(2026, 3, 1))]
+        before = [running_balances(user, day, date(2026, 3, 31)) for user, day in scopes]
+        # Jan and Feb are closed on Mar 18: one cash snapshot per month for the user and for the shop
+        self.assertEqual(take_snapshots(date(2026, 3, 18)), 4)
+        self.assertEqual(take_snapshots(date(2026, 3, 18)), 0)
+        self.assertEqual(BalanceSnapshot.objects.get(user=self.user, date=date(2026, 2, 28)).balance,
+                         Decimal("120.00"))
+        self.assertEqual([running_balances(user, day, date(2026, 3, 31)) for user, day in scopes], before)
+
+    def test_backdated_writes_drop_later_snapshots(self):
+        take_snapshots(date(2026, 3, 18))
+        _expense(self.user, date(2026, 2, 1), "10.00")
+        self.assertFalse(BalanceSnapshot.objects.filter(date=date(2026, 2, 28)).exists())
+        self.assertTrue(BalanceSnapshot.objects.filter(date=date(2026, 1, 31)).exists())
+        self.assertEqual(running_balances(self.user, date(2026, 3, 1), date(2026, 3, 31))["opening"]["cash"],
+                         Decimal("110.00"))
+
+    def test_api_scopes_and_validates(self):
+        self.client.force_login(self.user)
+        url = reverse("balances_api")
+        data = self.client.get(url, {"date_from": "2026-03-01", "date_to": "2026-03-31"}).json()
+        self.assertEqual({a["mode"]: (a["opening"], a["closing"]) for a in data["accounts"]},
+                         {"cash": ("120.00", "140.00"), "sbi": ("0.00", "-5.00")})
+        for params in ({"date_from": "2026-04-01", "date_to": "2026-03-01"}, {"date_from": "x"},
+                       {"mode": "bitcoin"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+STATEMENT_CSV = """Account No,0012345
+Statement period,01/01/2026 - 31/01/2026
+
+Txn Date,Narration,Withdrawal (Dr),Deposit (Cr),Balance
+01/01/2026,Opening balance,,,"1,000.00"
+02/01/2026,UPI/Rent,"1,200.50",,-200.50
+03-Jan-2026,NEFT/Sale,,300,99.50
+04/01/2026,Both,1,1,0
+05/01/2026,Card/Tea,45,,54.50
+Closing balance,,,,54.50
+"""
+
+
+class StatementImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+
+    def rows(self, text=STATEMENT_CSV, name="sbi_jan.csv"):
+        return statement_rows(BytesIO(text.encode()), name)
+
+    def test_cells(self):
+        self.assertEqual(parse_amount_cell("₹ 1,200.50"), Decimal("1200.50"))
+        self.assertEqual(parse_amount_cell(7.5), Decimal("7.5"))
+        for empty in (None, "", "-", True):
+            self.assertIsNone(parse_amount_cell(empty))
+        self.assertEqual(parse_date_cell("03-Jan-26"), date(2026, 1, 3))
+        self.assertIsNone(parse_date_cell("Closing balance"))
+        self.assertEqual(mode_from_name("ICICI_Statement_Apr.xlsx"), "icici")
+        self.assertIsNone(mode_from_name("statement.csv"))
+
+    def test_import_commits_chunk_by_chunk(self):
+        progress = [(s["income"], s["expense"]) for s in iter_import(self.user, self.rows(), "sbi", chunk_size=2)]
+        # a line with no amount is reported rather than booked
+        self.assertEqual(progress, [(1, 1), (1, 2)])
+        self.assertEqual(list(Expense.objects.filter(user=self.user).order_by("date").values_list(
+            "date", "description", "mode", "amount")), [
+            (date(2026, 1, 2), "UPI/Rent", "sbi", Decimal("1200.50")),
+            (date(2026, 1, 5), "Card/Tea", "sbi", Decimal("45.00")),
+        ])
+        self.assertEqual(Income.objects.get(user=self.user).amount, Decimal("300.00"))
+        # bulk inserts keep the rollups in step
+        self.assertEqual(LedgerRollup.objects.get(user=self.user, type="expense").total, Decimal("1245.50"))
+
+    def test_skipped_lines_are_reported(self):
+        stats = list(iter_import(self.user, self.rows(), "sbi"))[-1]
+        self.assertEqual(stats["skipped"], 3)
+        self.assertEqual(stats["errors"], ["line 5: no amount", "line 8: both debit and credit", "line 10: no date"])
+
+    def test_xlsx_with_amount_and_direction_columns(self):
+        from openpyxl import Workbook
+
+        wb = Workbook()
+        wb.active.append(["Date", "Description", "Amount", "Dr/Cr"])
+        wb.active.append([date(2026, 1, 2), "Fees", 10, "DR"])
+        wb.active.append([date(2026, 1, 3), "Sale", 25.5, "CR"])
+        upload = BytesIO()
+        wb.save(upload)
+        upload.seek(0)
+        stats = list(iter_import(self.user, statement_rows(upload, "icici.xlsx"), "icici"))[-1]
+        self.assertEqual((stats["income"], stats["expense"]), (1, 1))
+        self.assertEqual(Income.objects.get(user=self.user).amount, Decimal("25.50"))
+
+    def test_rejects_unreadable_files(self):
+        with self.assertRaises(StatementError):
+            statement_rows(BytesIO(b"x"), "statement.pdf")
+        with self.assertRaises(StatementError):
+            list(iter_import(self.user, self.rows("just,some\nwords,here\n"), "sbi"))
+        with self.assertRaises(StatementError):
+            list(iter_import(self.user, statement_rows(BytesIO(b"not a zip"), "a.xlsx"), "sbi"))
+
+    @override_settings(CLOSED_PERIOD_POLICY="block")
+    def test_closed_months_are_skipped(self):
+        _expense(self.user, date(2026, 1, 1), "1.00")
+        close_months(date(2026, 1, 1))
+        stats = list(iter_import(self.user, self.rows(), "sbi"))[-1]
+        self.assertEqual((stats["income"], stats["expense"]), (0, 0))
+        self.assertIn("2026-01-02: January 2026 is closed", stats["errors"])
+
+    def test_view_streams_ndjson_progress(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile("SBI_statement.csv", STATEMENT_CSV.encode(), content_type="text/csv")
+        response = self.client.post(reverse("import_statement"), {"statement": upload})
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        # the account comes from the file name
+        self.assertEqual(lines[-1]["status"], "success")
+        self.assertEqual(Expense.objects.filter(user=self.user, mode="sbi").count(), 2)
+        bad = SimpleUploadedFile("statement.pdf", b"%PDF", content_type="application/pdf")
+        self.assertEqual(self.client.post(reverse("import_statement"), {"statement": bad}).status_code, 400)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        user = User.objects.create_user("staff", password="pw")
+        _expense(user, date(2026, 1, 5), "10.00")
+        for name, query in hot_queries(user.id).items():
+            plans = query_plans(query)
+            self.assertTrue(plans, name)
+            for plan in plans:
+                with self.subTest(query=name):
+                    self.assertEqual(plan_problems(plan), [], plan)
+        # and the check does catch a bad plan
+        self.assertEqual(plan_problems(Expense.objects.order_by("description").explain()),
+                         ["full scan of expenses_expense", "temp B-tree sort"])
+
+
+class LedgerVersionTests(TransactionTestCase):
+    # autocommit, like the API views: only the code under test opens transactions.
+    # No ledger rows are written, so the ledger_search FTS table stays empty.
+
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+
+    def spy_bumps(self):
+        seen = []
+        real = rollups.bump_ledger_version
+
+        def bump(user_id):
+            # what a reader would pair with the new version
+            seen.append((connection.in_atomic_block,
+                         list(LedgerRollup.objects.filter(user_id=user_id).values_list("total", flat=True))))
+            real(user_id)
+        return seen, mock.patch.object(rollups, "bump_ledger_version", bump)
+
+    def test_version_is_bumped_after_the_totals_in_their_transaction(self):
+        seen, patch = self.spy_bumps()
+        with patch:
+            rollups.apply_delta(self.user.id, "expense", date(2026, 1, 5), "cash", Decimal("10.00"), 1)
+            rollups.add_rows("expense", [(self.user.id, date(2026, 1, 6), "cash", Decimal("5.00"), 1),
+                                         (self.user.id, date(2026, 1, 7), "cash", Decimal("1.00"), 1)])
+        self.assertEqual(seen, [(True, [Decimal("10.00")]), (True, [Decimal("16.00")])])
+
+    def test_failed_rollup_update_keeps_the_version(self):
+        rollups.apply_delta(self.user.id, "expense", date(2026, 1, 5), "cash", Decimal("10.00"), 1)
+        version = ledger_version(self.user.id)
+        with mock.patch.object(rollups, "record_adjustment", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                rollups.apply_delta(self.user.id, "expense", date(2026, 1, 5), "cash", Decimal("3.00"), 1)
+        self.assertEqual(ledger_version(self.user.id), version)
+        self.assertEqual(LedgerRollup.objects.get(user=self.user).total, Decimal("10.00"))
+
+    def test_rebuild_bumps_users_whose_rollups_went_away(self):
+        rollups.apply_delta(self.user.id, "expense", date(2026, 1, 5), "cash", Decimal("10.00"), 1)
+        version = ledger_version(self.user.id)
+        rollups.rebuild_rollups()
+        self.assertFalse(LedgerRollup.objects.exists())
+        self.assertGreater(ledger_version(self.user.id), version)
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+        self.client.force_login(self.user)
+        _temp_media(self)
+
+    def test_same_report_is_queued_once(self):
+        first = enqueue_export(self.user, "expense_pdf", {"date_from": "2026-01-01"})
+        self.assertEqual(enqueue_export(self.user, "expense_pdf", {"date_from": "2026-01-01"}), first)
+        self.assertNotEqual(enqueue_export(self.user, "expense_pdf", {"date_from": "2026-02-01"}), first)
+        self.assertNotEqual(enqueue_export(self.user, "income_pdf", {"date_from": "2026-01-01"}), first)
+
+    def test_claims_oldest_first_and_requeues_orphans(self):
+        first, second = enqueue_export(self.user, "income_pdf"), enqueue_export(self.user, "expense_pdf")
+        self.assertEqual(claim_next_job(), first.id)
+        self.assertEqual(claim_next_job(), second.id)
+        self.assertIsNone(claim_next_job())
+        # a worker that died leaves its jobs running
+        self.assertEqual(requeue_interrupted_jobs(), 2)
+        self.assertEqual(claim_next_job(), first.id)
+
+    def test_worker_renders_and_the_page_downloads(self):
+        _expense(self.user, date(2026, 1, 5), "12.00")
+        response = self.client.post(reverse("expenses:export_expenses_pdf"))
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()["status_url"]
+        self.assertEqual(self.client.get(status_url).json()["status"], "queued")
+
+        worker.run(claim_next_job())
+        data = self.client.get(status_url).json()
+        self.assertEqual((data["status"], data["progress"]), ("done", 100))
+        download = self.client.get(data["download_url"])
+        self.assertEqual(b"".join(download.streaming_content)[:5], b"%PDF-")
+
+        other = User.objects.create_user("other", password="pw")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+
+    def test_failed_jobs_report_the_error(self):
+        # a job queued with a report type the renderer no longer knows
+        job = enqueue_export(self.user, "report_pdf", {"type": "nope"})
+        with self.assertRaises(KeyError):
+            worker.run(claim_next_job())
+        data = self.client.get(reverse("export_job_status", args=[job.id])).json()
+        self.assertEqual((data["status"], data["error"]), ("failed", "'nope'"))
+
+    def test_purge_removes_expired_jobs_and_files(self):
+        job = enqueue_export(self.user, "income_pdf")
+        worker.run(claim_next_job())
+        job.refresh_from_db()
+        path = job.file.path
+        self.assertEqual(purge_expired_jobs(), 0)
+        ExportJob.objects.filter(pk=job.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.client.get(reverse("export_job_download", args=[job.id])).status_code, 404)
+        self.assertEqual(purge_expired_jobs(), 1)
+        self.assertFalse(ExportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+def _image(fmt="PNG", color=(255, 0, 0, 0), size=(300, 200)):
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.new("RGBA" if fmt == "PNG" else "RGB", size, color[:4 if fmt == "PNG" else 3]).save(buf, fmt)
+    return buf.getvalue()
+
+
+class AvatarThumbnailTests(TestCase):
+    def setUp(self):
+        _temp_media(self)
+        self.user = User.objects.create_user("staff", password="pw")
+        self.profile = self.user.profile
+
+    def upload(self, data, name="me.png"):
+        self.profile.avatar.save(name, ContentFile(data))
+        return build_thumbnails(self.profile)
+
+    def test_square_thumbnails_with_flattened_jpeg(self):
+        from PIL import Image
+
+        rendered = render_thumbnails(BytesIO(_image()))
+        self.assertEqual(set(rendered), {"webp", "jpg"})
+        with Image.open(BytesIO(rendered["jpg"])) as jpg:
+            self.assertEqual((jpg.format, jpg.size), ("JPEG", (THUMB_SIZE, THUMB_SIZE)))
+            # transparent pixels come out white, not black
+            self.assertGreater(min(jpg.getpixel((THUMB_SIZE // 2, THUMB_SIZE // 2))), 240)
+        with Image.open(BytesIO(rendered["webp"])) as webp:
+            self.assertEqual((webp.format, webp.mode), ("WEBP", "RGBA"))
+
+    def test_new_avatar_gets_new_names_and_drops_the_old_files(self):
+        first = self.upload(_image())
+        self.assertRegex(first["webp"], r"^avatars/thumbs/[0-9a-f]{20}\.webp$")
+        self.assertEqual(self.profile.avatar_webp_url, reverse("avatar_thumbnail", args=[first["webp"][15:]]))
+        self.assertFalse(pending_profiles().exists())
+
+        self.profile.avatar.save("me2.png", ContentFile(_image(color=(0, 0, 255, 255))))
+        self.assertTrue(pending_profiles().exists())
+        # until the new set is built the page falls back to the upload itself
+        self.assertEqual(self.profile.avatar_small_url, self.profile.avatar.url)
+        second = build_thumbnails(self.profile)
+        self.assertNotEqual(second["jpg"], first["jpg"])
+        self.assertTrue(default_storage.exists(second["jpg"]))
+        self.assertFalse(default_storage.exists(first["jpg"]))
+
+    def test_backfill_builds_pending_and_records_failures(self):
+        self.profile.avatar.save("me.png", ContentFile(_image()))
+        broken = User.objects.create_user("broken", password="pw").profile
+        broken.avatar.save("broken.png", ContentFile(b"not an image"))
+        out = StringIO()
+        call_command("build_avatar_thumbnails", stdout=out)
+        self.assertIn("Built thumbnails for 2 avatars", out.getvalue())
+        broken.refresh_from_db()
+        self.assertIn("error", broken.avatar_thumbs)
+        self.assertFalse(pending_profiles().exists())
+
+    def test_view_serves_thumbnails_for_good(self):
+        thumbs = self.upload(_image("JPEG"))
+        response = self.client.get(reverse("avatar_thumbnail", args=[thumbs["webp"][15:]]))
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response["Cache-Control"], CACHE_FOREVER)
+        self.assertEqual(self.client.get(reverse("avatar_thumbnail", args=["0" * 20 + ".jpg"])).status_code, 404)
+
+    def test_builds_are_queued_after_commit(self):
+        self.profile.avatar.save("me.png", ContentFile(_image()))
+        with mock.patch.object(avatars, "_build_later") as build, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            avatars.schedule_thumbnails(self.profile)
+            build.assert_not_called()
+        avatars._pool.shutdown(wait=True)
+        avatars._pool = None
+        self.assertEqual(len(callbacks), 1)
+        build.assert_called_once_with(self.profile.pk)
+
+
+class StaticBundleTests(TestCase):
+    def test_minify_css(self):
+        css = "/* header */\n.a  >  .b {\n  color: red;\n  margin: 0;\n}\n\n.c, .d { top: 1px; }\n"
+        self.assertEqual(minify_css(css), ".a>.b{color:red;margin:0}.c,.d{top:1px}\n")
+
+    def test_minify_js_keeps_lines_and_template_literals(self):
+        js = ("// helpers\n/* block\n   comment */\nfunction f() {\n    return 1\n}\n\n"
+              "const html = `<ul>\n    <li>${x}</li>\n`;\n    g()\n")
+        self.assertEqual(minify_js(js), "function f() {\nreturn 1\n}\nconst html = `<ul>\n    <li>${x}</li>\n`;\ng()\n")
+
+    def test_collectstatic_minifies_hashes_and_compresses(self):
+        source, root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        for path in (source, root):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        os.makedirs(os.path.join(source, "css"))
+        with open(os.path.join(source, "css", "site.css"), "w") as f:
+            f.write("/* site */\n" + "".join(f".c{i} {{\n    color: #{i:03d};\n}}\n" for i in range(200)))
+        with open(os.path.join(source, "css", "tiny.css"), "w") as f:
+            f.write("a{}\n")
+        with override_settings(STATICFILES_DIRS=[source], STATIC_ROOT=root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            name = staticfiles_storage.stored_name("css/site.css")
+            self.assertRegex(name, r"^css/site\.[0-9a-f]{12}\.css$")
+            with open(os.path.join(root, name), "rb") as f:
+                minified = f.read()
+            self.assertTrue(minified.startswith(b".c0{color:#000}"))
+            with open(os.path.join(root, name + ".gz"), "rb") as f:
+                self.assertEqual(gzip.decompress(f.read()), minified)
+            # not worth a second file
+            self.assertFalse(os.path.exists(os.path.join(root, staticfiles_storage.stored_name("css/tiny.css") + ".gz")))
+
+            request = RequestFactory().get("/static/" + name, headers={"Accept-Encoding": "gzip, deflate"})
+            response = static_asset(request, name)
+            self.assertEqual((response["Content-Encoding"], response["Content-Type"]), ("gzip", "text/css"))
+            self.assertEqual(response["Cache-Control"], CACHE_FOREVER)
+            self.assertEqual(static_asset(RequestFactory().get("/"), "css/site.css")["Cache-Control"], "no-cache")
+
+
+class ActivityFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+        # ids shared between the tables on one day: the feed breaks ties on the kind
+        for pk, day in ((5, date(2026, 1, 2)), (6, date(2026, 1, 1)), (7, date(2026, 1, 2))):
+            Income.objects.create(id=pk, user=self.user, date=day, description="sale", mode="cash", amount=1)
+            Expense.objects.create(id=pk, user=self.user, date=day, description="tea", mode="cash", amount=1)
+        Expense.objects.create(id=8, user=self.other, date=date(2026, 1, 3), description="x", mode="cash", amount=1)
+
+    def walk(self, user, limit):
+        seen, cursor = [], None
+        while True:
+            items, cursor = activity_page(user, cursor=cursor, limit=limit)
+            seen += [(i["date"].day, i["id"], i["type"]) for i in items]
+            if cursor is None:
+                return seen
+
+    def test_pages_merge_both_ledgers_in_order(self):
+        expected = [(2, 7, "income"), (2, 7, "expense"), (2, 5, "income"), (2, 5, "expense"),
+                    (1, 6, "income"), (1, 6, "expense")]
+        for limit in (1, 2, 4, 20):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(self.user, limit), expected)
+        self.assertEqual(self.walk(None, 3)[0], (3, 8, "expense"))
+
+    def test_owner_feed_names_the_user(self):
+        items, _ = activity_page(None, limit=1)
+        self.assertEqual(items[0]["user"], "other")
+        self.assertNotIn("user", activity_page(self.user, limit=1)[0][0])
+
+    def test_bad_cursors(self):
+        for cursor in ("2026-01-02_5", "2026-01-02_x_income", "2026-01-02_5_transfer", "x"):
+            with self.assertRaises(ValueError):
+                decode_feed_cursor(cursor)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("activity_api"), {"cursor": "x"})
+        self.assertEqual(response.status_code, 400)
+        data = self.client.get(reverse("activity_api"), {"limit": 5}).json()
+        self.assertEqual(len(data["results"]), 5)
+        self.assertEqual(data["next_cursor"], "2026-01-01_6_income")
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+
+    def income(self, day, description):
+        return Income.objects.create(user=self.user, date=day, description=description, mode="cash", amount=1)
+
+    def search(self, query, **kwargs):
+        rows, cursor = search_ledger(query, **kwargs)
+        return [(r[0], r[1]) for r in rows], cursor
+
+    def test_income_and_expenses_come_in_one_date_order(self):
+        # the expense is newer than the income rows written after it
+        expense = _expense(self.user, date(2026, 3, 1), "1.00", description="Milk crate")
+        old = [self.income(date(2026, 1, d), "Milk sale") for d in (1, 2)]
+        newest = self.income(date(2026, 4, 1), "Milk refund")
+        found, cursor = self.search("mil")
+        self.assertEqual(found, [("income", newest.id), ("expense", expense.id),
+                                 ("income", old[1].id), ("income", old[0].id)])
+        self.assertIsNone(cursor)
+
+    def test_older_matches_are_reached_through_the_cursor(self):
+        rows = [self.income(date(2025, 1, 1), "Tea") for _ in range(3)]
+        rows += [_expense(self.user, date(2026, 6, d), "1.00") for d in range(1, 30)]
+        expected = [("expense", e.id) for e in reversed(rows[3:])] + [("income", i.id) for i in reversed(rows[:3])]
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.search("tea", user=self.user, limit=10, cursor=cursor)
+            seen += page
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_edits_move_rows_in_the_index(self):
+        row = self.income(date(2026, 1, 1), "Tea")
+        newer = self.income(date(2026, 2, 1), "Tea")
+        row.date = date(2026, 3, 1)
+        row.save()
+        self.assertEqual(self.search("tea")[0], [("income", row.id), ("income", newer.id)])
+        newer.description = "Coffee"
+        newer.save()
+        self.assertEqual(self.search("tea")[0], [("income", row.id)])
+        row.delete()
+        self.assertEqual(self.search("tea")[0], [])
+
+    def test_scoping_and_errors(self):
+        other = User.objects.create_user("other", password="pw")
+        mine = _expense(self.user, date(2026, 1, 1), "1.00", description="Bread")
+        _expense(other, date(2026, 1, 2), "1.00", description="Bread")
+        self.income(date(2026, 1, 3), "Bread")
+        self.assertEqual(self.search("bre", user=self.user, kinds=["expense"])[0], [("expense", mine.id)])
+        for query, cursor in (("", None), ("bread", "x"), ("bread", "-5")):
+            with self.assertRaises(ValueError):
+                search_ledger(query, cursor=cursor)
+
+    def test_api_pages_and_rejects_bad_cursors(self):
+        self.client.force_login(self.user)
+        rows = [_expense(self.user, date(2026, 1, d), "1.00") for d in (1, 2, 3)]
+        first = self.client.get(reverse("search_api"), {"q": "tea", "limit": 2}).json()
+        second = self.client.get(reverse("search_api"), {"q": "tea", "limit": 2,
+                                                         "cursor": first["next_cursor"]}).json()
+        self.assertEqual([r["id"] for r in first["results"] + second["results"]], [r.id for r in reversed(rows)])
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(self.client.get(reverse("search_api"), {"q": "tea", "cursor": "x"}).status_code, 400)
+
+
+class SeedLedgerTests(TestCase):
+    def seed(self, *args):
+        call_command("seed_ledger", *args, stdout=StringIO())
+
+    def test_seeds_users_rows_and_rollups(self):
+        self.seed("--users", "2", "--rows", "30", "--owner", "--prefix", "t", "--modes", "cash=1,sbi=1",
+                  "--days", "60", "--seed", "1", "--batch-size", "7")
+        staff = User.objects.filter(username__in=["t001", "t002"])
+        self.assertEqual(staff.count(), 2)
+        self.assertEqual(User.objects.get(username="t_owner").profile.role, "owner")
+        for model, type_ in ((Income, "income"), (Expense, "expense")):
+            rows = model.objects.filter(user__in=staff)
+            self.assertEqual(rows.count(), 60)
+            self.assertEqual(set(rows.values_list("mode", flat=True)), {"cash", "sbi"})
+            # bulk inserts keep the rollups in step
+            rollup = LedgerRollup.objects.filter(type=type_).aggregate(total=Sum("total"))["total"]
+            self.assertEqual(rollup, rows.aggregate(total=Sum("amount"))["total"])
+
+    def test_refuses_existing_prefix_and_unknown_modes(self):
+        self.seed("--users", "1", "--rows", "1", "--prefix", "t")
+        with self.assertRaises(CommandError):
+            self.seed("--users", "1", "--rows", "1", "--prefix", "t")
+        with self.assertRaises(CommandError):
+            self.seed("--users", "1", "--rows", "1", "--prefix", "u", "--modes", "bitcoin=1")
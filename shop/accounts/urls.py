@@ -1,17 +1,30 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/api/', views.api_dashboard, name='dashboard_api'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
     path('register/', views.register_view, name='register'),
+    re_path(r'^avatars/(?P<name>[0-9a-f]{20}\.(?:webp|jpg))$', views.avatar_thumbnail, name='avatar_thumbnail'),
     path('forgot-password/', views.forgot_password_view, name='forgot_password'),
     path('about/',views.about_view, name='about'),
     path('expenses/',views.expenses_view, name='expenses'),
     path('greeting/', views.greeting_view, name='greeting'),
     path("owner/dashboard/", views.owner_dashboard, name="owner_dashboard"),
+    path("owner/staff/<int:user_id>/", views.owner_staff_detail, name="owner_staff_detail"),
     path("staff/dashboard/", views.staff_dashboard, name="staff_dashboard"),
     path("dashboard/", views.dashboard_redirect, name="dashboard"),
     path('activity/', views.activity_view, name='activity'),
+    path('activity/api/', views.api_activity, name='activity_api'),
+    path('search/api/', views.api_search, name='search_api'),
+    path('balances/', views.balances_view, name='balances'),
+    path('balances/api/', views.api_balances, name='balances_api'),
+    path('reports/excel/', views.report_excel, name='report_excel'),
+    path('reports/pdf/', views.report_pdf, name='report_pdf'),
+    path('exports/<int:job_id>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('import/', views.import_statement_view, name='import_statement'),
 ]
@@ -15,7 +15,30 @@ from django.utils import timezone
 from django.db.models.functions import TruncMonth
 import datetime as dt
 from django.db import transaction
-from .models import Transaction
+from .models import Transaction, LedgerRollup, ExportJob
+from .jobs import enqueue_export, job_payload
+from .ledger_cache import acached_context, cache_stats, cached_context, ledger_etag
+from asgiref.sync import sync_to_async
+from .activity import activity_page
+from .analytics import WINDOWS, ledger_summary, month_window, window_dates
+from .avatars import CACHE_FOREVER, THUMB_DIR, THUMB_FORMATS, schedule_thumbnails
+from .balances import account_modes, running_balances
+from .closing import ledger_totals, merge_totals
+from .reports import report_spec, report_xlsx_response
+from .search import SEARCH_KINDS, search_ledger
+from .serialization import FastJsonResponse
+from django.utils.dateparse import parse_date
+from .pagination import page_size
+from .statements import StatementError, iter_import, mode_from_name, statement_modes, statement_rows
+from django.http import JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+import json
+from django.shortcuts import get_object_or_404
+import mimetypes
+import os
+import posixpath
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
 
 
 def login_view(request):
@@ -69,23 +92,60 @@ def register_view(request):
                 if avatar:
                     profile.avatar = avatar
                 profile.save()
+            if avatar:
+                schedule_thumbnails(profile)
 
         messages.success(request, "Account created")
         return redirect('login')
     return render(request, 'register.html')
 
 
+@login_required
 def upload_avatar(request):
     if request.method == "POST":
         avatar = request.FILES.get("avatar")
         if avatar:
-            profile = Profile.objects.get(user=request.user)
+            profile = getattr(request.user, "profile", None) or Profile(user=request.user)
             profile.avatar = avatar
             profile.save()
+            schedule_thumbnails(profile)
             return redirect("profile")  # change 'profile' to your URL name
     return render(request, "upload_avatar.html")
 
 
+def avatar_thumbnail(request, name):
+    # names are content hashes (accounts.avatars), so a URL's bytes never change
+    path = THUMB_DIR + name
+    if not default_storage.exists(path):
+        raise Http404("No such thumbnail")
+    content_type = THUMB_FORMATS[name.rsplit(".", 1)[-1]][2]
+    response = FileResponse(default_storage.open(path, "rb"), content_type=content_type)
+    response["Cache-Control"] = CACHE_FOREVER
+    return response
+
+
+def static_asset(request, path):
+    # collectstatic output: the .br/.gz twin when the client takes it, hashed names cached for good
+    name = posixpath.normpath(path).lstrip("/")
+    if name.startswith("..") or not staticfiles_storage.exists(name):
+        raise Http404("No such file")
+    served, accept = name, request.headers.get("Accept-Encoding", "")
+    for ext, encoding in (("br", "br"), ("gz", "gzip")):
+        if encoding in accept and staticfiles_storage.exists(f"{name}.{ext}"):
+            served = f"{name}.{ext}"
+            break
+    else:
+        encoding = None
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    response = FileResponse(staticfiles_storage.open(served), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    hashed = name in set(staticfiles_storage.hashed_files.values())
+    response["Cache-Control"] = CACHE_FOREVER if hashed else "no-cache"
+    return response
+
+
 def forgot_password_view(request):
     if request.method == "POST":
         email = request.POST.get("email")
@@ -113,58 +173,49 @@ except Exception:
     HAVE_INCOME = False
 
 
+def _role(user):
+    # request.user is loaded with its profile by ProfileBackend, so this is no query
+    return getattr(getattr(user, "profile", None), "role", "staff")
+
+
 @login_required
 def dashboard(request):
     user = request.user
-    profile = getattr(user, "profile", None)
-    role = getattr(profile, "role", "staff") if profile else "staff"
+    role = _role(user)
+    today = timezone.localdate()
+    context = cached_context(user, role == "owner", today,
+                             lambda: _dashboard_context(user, role, today))
+    return render(request, "dashboard.html", context)
 
-    # ---------- incomes & expenses queryset (role-based) ----------
-    if role == "owner":
-        incomes_qs = Income.objects.all()
-        expenses_qs = Expense.objects.all()
-        transactions_qs = Transaction.objects.all()
-    else:
-        incomes_qs = Income.objects.filter(user=user)
-        expenses_qs = Expense.objects.filter(user=user)
-        transactions_qs = Transaction.objects.filter(user=user)
 
-    # ---------- totals ----------
-    income_agg = incomes_qs.aggregate(total=Sum("amount"))["total"] or 0
-    expense_agg = expenses_qs.aggregate(total=Sum("amount"))["total"] or 0
+def _is_owner(user):
+    return _role(user) == "owner"
 
-    total_income = Decimal(income_agg)
-    total_expense = Decimal(expense_agg)
-    balance = total_income - total_expense
 
-    # transactions count
-    tx_count = incomes_qs.count() + expenses_qs.count()
+@login_required
+@ledger_etag(shop_wide=_is_owner, daily=True)
+async def api_dashboard(request):
+    # same data as the dashboard page, as JSON, without tying up a worker thread under ASGI
+    user = await request.auser()
+    role = _role(user)
+    today = timezone.localdate()
+    context = await acached_context(user, role == "owner", today,
+                                    lambda: _adashboard_context(user, role, today))
+    return JsonResponse(context)
 
-    # ---------- recent transactions (last 5) ----------
-    recent_items = []
-    for e in expenses_qs.order_by("-date")[:10]:
-        recent_items.append({
-            "id": e.id,
-            "date": e.date,
-            "description": e.description,
-            "amount": float(e.amount),
-            "type": "expense",
-            "timestamp": e.date.isoformat() if e.date else ""
-        })
-    for i in incomes_qs.order_by("-date")[:10]:
-        recent_items.append({
-            "id": i.id,
-            "date": i.date,
-            "description": i.description,
-            "amount": float(i.amount),
-            "type": "income",
-            "timestamp": i.date.isoformat() if i.date else ""
-        })
-    recent_sorted = sorted(recent_items, key=lambda x: x["timestamp"], reverse=True)[:5]
+
+def _dashboard_queries(user, role, today, months_count=6):
+    """Return (mode_qs, month_qs, months) for the dashboard; nothing is evaluated here."""
+    # ---------- rollup queryset (role-based) ----------
+    if role == "owner":
+        rollups_qs = LedgerRollup.objects.all()
+    else:
+        rollups_qs = LedgerRollup.objects.filter(user=user)
+
+    # ---------- totals + mode breakdown: closed months' frozen totals + the open period ----------
+    mode_qs = ledger_totals(None if role == "owner" else user.id)
 
     # ---------- monthly chart data (last 6 months) ----------
-    months_count = 6
-    today = timezone.localdate()
     start_idx = today.year * 12 + today.month - 1 - (months_count - 1)
     months = []
     for j in range(months_count):
@@ -172,42 +223,61 @@ def dashboard(request):
         y = idx // 12
         m = idx % 12 + 1
         months.append(date(y, m, 1))
-    start_date = months[0]
-
-    # income per month
-    inc_map = {}
-    for r in (incomes_qs.filter(date__gte=start_date)
-              .annotate(month=TruncMonth("date"))
-              .values("month")
-              .annotate(total=Sum("amount"))
-              .order_by("month")):
-        mon = r["month"].date() if hasattr(r["month"], "date") else r["month"]
-        inc_map[(mon.year, mon.month)] = float(r["total"] or 0)
-
-    # expense per month
-    exp_map = {}
-    for r in (expenses_qs.filter(date__gte=start_date)
-              .annotate(month=TruncMonth("date"))
-              .values("month")
-              .annotate(total=Sum("amount"))
-              .order_by("month")):
-        mon = r["month"].date() if hasattr(r["month"], "date") else r["month"]
-        exp_map[(mon.year, mon.month)] = float(r["total"] or 0)
+    month_qs = (rollups_qs.filter(month__gte=months[0])
+                .values("month", "type")
+                .annotate(total=Sum("total"))
+                .order_by("month"))
+    return mode_qs, month_qs, months
+
+
+def _dashboard_context(user, role, today):
+    mode_qs, month_qs, months = _dashboard_queries(user, role, today)
+    # ---------- recent transactions (last 5) ----------
+    recent, _ = activity_page(None if role == "owner" else user, limit=5)
+    return _build_dashboard_context(role, merge_totals(mode_qs), list(month_qs), months, recent)
+
+
+async def _adashboard_context(user, role, today):
+    mode_qs, month_qs, months = _dashboard_queries(user, role, today)
+    # a UNION ALL of values() querysets: no native async iterator, read it on the ORM thread
+    mode_rows = merge_totals(await sync_to_async(list)(mode_qs))
+    month_rows = [r async for r in month_qs.aiterator()]
+    # the UNION ALL feed has no async variant; run it on the ORM thread
+    recent, _ = await sync_to_async(activity_page)(None if role == "owner" else user, limit=5)
+    return _build_dashboard_context(role, mode_rows, month_rows, months, recent)
+
+
+def _build_dashboard_context(role, mode_rows, month_rows, months, recent_sorted):
+    totals = {"income": Decimal(0), "expense": Decimal(0)}
+    tx_count = 0
+    mode_totals = {"income": {}, "expense": {}}
+    for r in mode_rows:
+        if not r["count"]:
+            continue
+        totals[r["type"]] += Decimal(r["total"] or 0)
+        tx_count += r["count"]
+        label = r["mode"] or "Unknown"
+        mode_totals[r["type"]][label] = mode_totals[r["type"]].get(label, 0) + float(r["total"] or 0)
+
+    total_income = totals["income"]
+    total_expense = totals["expense"]
+    balance = total_income - total_expense
+
+    # income/expense per month
+    inc_map, exp_map = {}, {}
+    for r in month_rows:
+        target = inc_map if r["type"] == "income" else exp_map
+        target[(r["month"].year, r["month"].month)] = float(r["total"] or 0)
 
     labels = [m.strftime("%b %Y") for m in months]
     income_values = [inc_map.get((m.year, m.month), 0) for m in months]
     expense_values = [exp_map.get((m.year, m.month), 0) for m in months]
 
     # ---------- mode charts ----------
-    income_mode_labels, income_mode_values = [], []
-    for r in incomes_qs.values("mode").annotate(total=Sum("amount")).order_by("-total"):
-        income_mode_labels.append(r["mode"] or "Unknown")
-        income_mode_values.append(float(r["total"] or 0))
-
-    expense_mode_labels, expense_mode_values = [], []
-    for r in expenses_qs.values("mode").annotate(total=Sum("amount")).order_by("-total"):
-        expense_mode_labels.append(r["mode"] or "Unknown")
-        expense_mode_values.append(float(r["total"] or 0))
+    income_mode_labels = list(mode_totals["income"])
+    income_mode_values = list(mode_totals["income"].values())
+    expense_mode_labels = list(mode_totals["expense"])
+    expense_mode_values = list(mode_totals["expense"].values())
 
     # ---------- final context ----------
     context = {
@@ -226,8 +296,7 @@ def dashboard(request):
         "is_owner": role == "owner",
         "role": role, 
     }
-
-    return render(request, "dashboard.html", context)
+    return context
 
 
 
@@ -259,11 +328,50 @@ def expenses_view(request):
 
 @login_required
 def owner_dashboard(request):
-    incomes = Income.objects.all().order_by("-date")
-    expenses = Expense.objects.all().order_by("-date")
-    return render(request, "dashboards/owner_dashboard.html",{
-        "incomes": incomes,
-        "expenses": expenses,
+    if _role(request.user) != "owner":
+        return redirect("staff_dashboard")
+    try:
+        window, first_month, last_month = month_window(request.GET, timezone.localdate())
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        window, first_month, last_month = month_window({}, timezone.localdate())
+    return render(request, "dashboards/owner_dashboard.html", {
+        "summary": ledger_summary(first_month, last_month),
+        "window": window,
+        "windows": WINDOWS,
+        "first_month": first_month,
+        "last_month": last_month,
+        "query": request.GET.urlencode(),
+    })
+
+
+@login_required
+def owner_staff_detail(request, user_id):
+    if _role(request.user) != "owner":
+        return redirect("staff_dashboard")
+    staff = get_object_or_404(User, pk=user_id)
+    try:
+        window, first_month, last_month = month_window(request.GET, timezone.localdate())
+        date_from, date_to = window_dates(first_month, last_month)
+        rows, next_cursor = activity_page(
+            staff, cursor=request.GET.get("cursor"), limit=page_size(request.GET),
+            date_from=date_from, date_to=date_to,
+        )
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect("owner_staff_detail", user_id=user_id)
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    return render(request, "dashboards/owner_staff_detail.html", {
+        "staff": staff,
+        "summary": ledger_summary(first_month, last_month, user_id=staff.id),
+        "rows": rows,
+        "next_cursor": next_cursor,
+        "window": window,
+        "windows": WINDOWS,
+        "first_month": first_month,
+        "last_month": last_month,
+        "query": params.urlencode(),
     })
 
 
@@ -281,29 +389,210 @@ def staff_dashboard(request):
 
 @login_required
 def activity_view(request):
-    # safe access to profile and role
-    profile = getattr(request.user, "profile", None)
-    role = getattr(profile, "role", "staff") if profile else "staff"
+    # rows are loaded page by page from api_activity
+    role = _role(request.user)
+    return render(request, "dashboards/activity.html", {
+        "is_owner": role == "owner",
+    })
 
-    if role == "owner":
-        incomes = Income.objects.select_related("user").all().order_by("-date")
-        expenses = Expense.objects.select_related("user").all().order_by("-date")
-        is_owner = True
-    else:
-        incomes = Income.objects.filter(user=request.user).order_by("-date")
-        expenses = Expense.objects.filter(user=request.user).order_by("-date")
-        is_owner = False
 
-    return render(request, "dashboards/activity.html", {
-        "incomes": incomes,
-        "expenses": expenses,
-        "is_owner": is_owner,
+@login_required
+@ledger_etag(shop_wide=_is_owner)
+def api_activity(request):
+    role = _role(request.user)
+    try:
+        items, next_cursor = activity_page(
+            None if role == "owner" else request.user,
+            cursor=request.GET.get("cursor"),
+            limit=page_size(request.GET),
+        )
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+    return JsonResponse({"results": items, "next_cursor": next_cursor})
+
+
+# ---------- full-text search ----------
+@login_required
+def api_search(request):
+    # ?q=words (each matched as a prefix), ?type=income|expense, ?limit=, ?cursor=; newest entries first
+    user = request.user
+    is_owner = _is_owner(user)
+    kind = request.GET.get("type") or ""
+    if kind and kind not in SEARCH_KINDS:
+        return JsonResponse({"status": "error", "message": "Invalid type"}, status=400)
+    try:
+        rows, next_cursor = search_ledger(request.GET.get("q"), None if is_owner else user,
+                                          kinds=[kind] if kind else None, limit=page_size(request.GET),
+                                          cursor=request.GET.get("cursor"))
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+    names = {}
+    if is_owner:
+        names = dict(User.objects.filter(id__in={r[6] for r in rows}).values_list("id", "username"))
+    results = []
+    for kind, pk, day, description, mode, amount, user_id in rows:
+        item = {"type": kind, "id": pk, "date": str(day), "description": description,
+                "mode": mode, "amount": str(Decimal(str(amount)).quantize(Decimal("0.01")))}
+        if is_owner:
+            item["user"] = names.get(user_id, f"#{user_id}")
+        results.append(item)
+    return FastJsonResponse({"results": results, "next_cursor": next_cursor})
+
+
+# ---------- account balances ----------
+BALANCE_DEFAULT_DAYS = 30
+
+
+@login_required
+def balances_view(request):
+    # figures are loaded from api_balances
+    return render(request, "dashboards/balances.html", {
+        "is_owner": _is_owner(request.user),
+        "modes": account_modes(),
+        "default_days": BALANCE_DEFAULT_DAYS,
+    })
+
+
+def _balance_range(params, today):
+    date_from, date_to = today - dt.timedelta(days=BALANCE_DEFAULT_DAYS - 1), today
+    for key in ("date_from", "date_to"):
+        raw = params.get(key)
+        if raw:
+            d = parse_date(raw)
+            if not d:
+                raise ValueError(f"Invalid {key}")
+            if key == "date_from":
+                date_from = d
+            else:
+                date_to = d
+    if date_from > date_to:
+        raise ValueError("date_from is after date_to")
+    return date_from, date_to
+
+
+@login_required
+@ledger_etag(shop_wide=_is_owner, daily=True)
+def api_balances(request):
+    # owners see the shop's accounts, staff their own entries
+    user = request.user
+    labels = dict(account_modes())
+    try:
+        date_from, date_to = _balance_range(request.GET, timezone.localdate())
+        modes = [m for m in request.GET.getlist("mode") if m]
+        if any(m not in labels for m in modes):
+            raise ValueError("Invalid mode")
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+
+    result = running_balances(None if _is_owner(user) else user, date_from, date_to, modes)
+    opening, closing = result["opening"], result["closing"]
+    shown = modes or [m for m in labels if m in closing] + sorted(set(closing) - set(labels))
+    return FastJsonResponse({
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "accounts": [
+            {"mode": m, "label": labels.get(m, m or "-"),
+             "opening": str(opening.get(m, Decimal("0.00"))),
+             "closing": str(closing.get(m, Decimal("0.00")))}
+            for m in shown
+        ],
+        "days": [
+            {"date": r["date"].isoformat(), "mode": r["mode"], "net": str(r["net"]), "balance": str(r["balance"])}
+            for r in result["days"]
+        ],
     })
 
 @login_required
 def dashboard_redirect(request):
-    role = getattr(getattr(request.user, "profile", None), "role", "staff")
-    if role == "owner":
+    if _role(request.user) == "owner":
         return redirect("owner_dashboard")
     return redirect("staff_dashboard")
 
+
+@login_required
+def dashboard_cache_stats(request):
+    if _role(request.user) != "owner":
+        return JsonResponse({"status": "error", "message": "Owners only"}, status=403)
+    return JsonResponse(cache_stats())
+
+
+# ---------- income/expense reports ----------
+def _report_spec(request):
+    # owners report on the whole shop (or ?user=<id>), staff on their own rows
+    return report_spec(request.GET, request.user, shop_wide=_is_owner(request.user),
+                       today=timezone.localdate())
+
+
+@login_required
+def report_excel(request):
+    # ?type=income|expense|both, ?period=last_month|this_month or ?date_from=&date_to=, ?mode=
+    try:
+        spec = _report_spec(request)
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+    return report_xlsx_response(spec)
+
+
+@login_required
+def report_pdf(request):
+    # same filters as report_excel; rendered by the export worker, the page polls the job
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "POST only"}, status=405)
+    try:
+        spec = _report_spec(request)
+    except ValueError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+    job = enqueue_export(request.user, "report_pdf", spec)
+    return JsonResponse(job_payload(job), status=202)
+
+
+# ---------- background export jobs ----------
+@login_required
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user)
+    return JsonResponse(job_payload(job))
+
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user, status="done")
+    if not job.file or (job.expires_at and job.expires_at < timezone.now()):
+        raise Http404("Export expired")
+    return FileResponse(job.file.open("rb"), as_attachment=True, filename=os.path.basename(job.file.name))
+
+
+# ---------- bank statement import ----------
+@login_required
+def import_statement_view(request):
+    if request.method != "POST":
+        return render(request, "import_statement.html", {"modes": sorted(statement_modes())})
+    upload = request.FILES.get("statement")
+    if not upload:
+        return JsonResponse({"status": "error", "message": "No file uploaded"}, status=400)
+    mode = request.POST.get("mode") or mode_from_name(upload.name)
+    if mode and mode not in statement_modes():
+        return JsonResponse({"status": "error", "message": "Invalid mode"}, status=400)
+    try:
+        rows = statement_rows(upload.file, upload.name)
+    except StatementError as exc:
+        return JsonResponse({"status": "error", "message": str(exc)}, status=400)
+
+    def progress_lines():
+        # one JSON object per line after each committed chunk, then the summary
+        try:
+            for stats in iter_import(request.user, rows, mode):
+                yield json.dumps({"status": "running", **stats}) + "\n"
+            yield json.dumps({"status": "success", **stats}) + "\n"
+        except ValueError as exc:
+            yield json.dumps({"status": "error", "message": str(exc)}) + "\n"
+
+    async def aprogress_lines():
+        # ASGI would read a sync iterator to the end before sending it: run each
+        # chunk of the import in a worker thread and send its line as it commits
+        lines = progress_lines()
+        next_line = sync_to_async(lambda: next(lines, None))
+        while (line := await next_line()) is not None:
+            yield line
+
+    lines = aprogress_lines() if isinstance(request, ASGIRequest) else progress_lines()
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
@@ -0,0 +1,13 @@
+# accounts/worker.py
+# Entry points for run_export_worker's spawned pool processes. No Django imports at
+# module level: this module is unpickled in the child before django.setup() runs.
+
+
+def init():
+    import django
+    django.setup()
+
+
+def run(job_id):
+    from accounts.jobs import run_job
+    return run_job(job_id)
@@ -0,0 +1,65 @@
+# accounts/writer.py
+# Optional single-writer queue for ledger writes (settings.SQLITE_WRITE_QUEUE).
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_jobs = queue.Queue()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        future, fn, args, kwargs = _jobs.get()
+        if not future.set_running_or_notify_cancel():
+            continue
+        close_old_connections()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+
+def _ensure_thread():
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_work, name="ledger-writer", daemon=True)
+            _thread.start()
+
+
+def enabled():
+    return getattr(settings, "SQLITE_WRITE_QUEUE", False)
+
+
+def submit_write(fn, *args, **kwargs):
+    """Queue fn(*args, **kwargs) for the writer thread and return a Future."""
+    _ensure_thread()
+    future = Future()
+    _jobs.put((future, fn, args, kwargs))
+    return future
+
+
+def ledger_write(fn, *args, **kwargs):
+    """Run a ledger write, on the writer thread when the queue is enabled.
+
+    All queued writes share the writer thread's connection and run one at a
+    time in FIFO order, so SQLite never sees two writers from this process
+    and readers (WAL) are never blocked by them.
+    """
+    if not enabled() or threading.current_thread() is _thread:
+        return fn(*args, **kwargs)
+    return submit_write(fn, *args, **kwargs).result()
+
+
+async def aledger_write(fn, *args, **kwargs):
+    """ledger_write for async views; the event loop is free while the write waits."""
+    if not enabled():
+        return await sync_to_async(fn)(*args, **kwargs)
+    return await asyncio.wrap_future(submit_write(fn, *args, **kwargs))
@@ -1,7 +1,10 @@
 # expenses/admin.py
 from django.contrib import admin
+from accounts.search import FullTextSearchMixin
 from .models import Expense
 
 @admin.register(Expense)
-class ExpenseAdmin(admin.ModelAdmin):
+class ExpenseAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("date", "description", "mode", "amount", "user")
+    search_fields = ("description", "user__username")
+    search_kind = "expense"
@@ -20,6 +20,18 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # per-user lists, keyset pages and "recent" widgets: WHERE user ORDER BY date, id
+            models.Index(fields=['user', 'date', 'id'], name='expense_user_date_id'),
+            # covering index for per-user date-range totals by mode
+            models.Index(fields=['user', 'date', 'mode', 'amount'], name='expense_user_date_cover'),
+            # owner views that order the whole table by date
+            models.Index(fields=['date', 'id'], name='expense_date_id'),
+            # delta sync: WHERE user AND updated_at > since
+            models.Index(fields=['user', 'updated_at'], name='expense_user_updated'),
+        ]
+
     def as_dict(self):
         return {
             'id': self.id,
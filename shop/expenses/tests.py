@@ -1,3 +1,185 @@
+import json
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import LedgerRollup
+
+from .models import Expense
+
+
+class ExpenseApiTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+        self.client.force_login(self.user)
+
+    def add(self, day, amount, mode="cash", description="tea"):
+        return Expense.objects.create(user=self.user, date=day, description=description, mode=mode,
+                                      amount=Decimal(amount))
+
+    def batch(self, operations):
+        return self.client.post(reverse("expenses:api_batch"), json.dumps({"operations": operations}),
+                                content_type="application/json")
+
+
+class ExpenseListTests(ExpenseApiTestCase):
+    def test_pages_follow_the_cursor(self):
+        rows = [self.add(date(2026, 1, d), "10.00") for d in (1, 2, 2, 3, 4)]
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(reverse("expenses:api_list"), params).json()
+            ids += [r["id"] for r in data["results"]]
+            # the filtered total comes with the first page only
+            self.assertEqual("total" in data, cursor is None)
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(ids, [e.id for e in sorted(rows, key=lambda e: (e.date, e.id), reverse=True)])
+
+    def test_bad_filters_are_a_400(self):
+        for params in ({"min_amount": "NaN"}, {"max_amount": "Infinity"}, {"cursor": "x"}, {"mode": "nope"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("expenses:api_list"), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["status"], "error")
+
+    def test_only_own_rows(self):
+        other = User.objects.create_user("other", password="pw")
+        Expense.objects.create(user=other, date=date(2026, 1, 1), description="x", mode="cash", amount=1)
+        mine = self.add(date(2026, 1, 1), "2.00")
+        data = self.client.get(reverse("expenses:api_list")).json()
+        self.assertEqual([r["id"] for r in data["results"]], [mine.id])
+
+
+class ExpenseWriteTests(ExpenseApiTestCase):
+    def post(self, name, payload):
+        return self.client.post(reverse(name), json.dumps(payload), content_type="application/json")
+
+    def test_writes_keep_the_rollup_in_step(self):
+        response = self.post("expenses:api_add", {"date": "2026-01-05", "description": "milk", "mode": "cash",
+                                                  "amount": "12.50"})
+        pk = response.json()["id"]
+        self.post("expenses:api_update", {"id": pk, "date": "2026-01-05", "description": "milk", "mode": "sbi",
+                                          "amount": "20.00"})
+        rollups = dict(LedgerRollup.objects.filter(user=self.user).values_list("mode", "total"))
+        self.assertEqual(rollups, {"cash": Decimal("0.00"), "sbi": Decimal("20.00")})
+
+    def test_a_failed_rollup_update_rolls_the_row_back(self):
+        row = self.add(date(2026, 1, 5), "10.00")
+        locked = OperationalError("database is locked")
+        with mock.patch("accounts.signals.apply_delta", side_effect=locked):
+            add = self.post("expenses:api_add", {"date": "2026-01-06", "description": "milk", "mode": "cash",
+                                                 "amount": "5.00"})
+            update = self.post("expenses:api_update", {"id": row.id, "date": "2026-01-05", "description": "tea",
+                                                       "mode": "cash", "amount": "99.00"})
+            delete = self.post("expenses:api_delete", {"id": row.id})
+        self.assertEqual([r.status_code for r in (add, update, delete)], [400, 400, 400])
+        self.assertEqual(list(Expense.objects.filter(user=self.user).values_list("id", "amount")),
+                         [(row.id, Decimal("10.00"))])
+        self.assertEqual(LedgerRollup.objects.get(user=self.user).total, Decimal("10.00"))
+
+
+class ExpenseCsvExportTests(ExpenseApiTestCase):
+    async def test_streams_the_filtered_rows_under_asgi(self):
+        # the ASGI path feeds the response from an async iterator
+        await Expense.objects.acreate(user=self.user, date=date(2026, 1, 1), description="tea", mode="cash",
+                                      amount=Decimal("3.00"))
+        await Expense.objects.acreate(user=self.user, date=date(2026, 1, 2), description="rent", mode="sbi",
+                                      amount=Decimal("9.00"))
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("expenses:export_expenses_csv"), {"mode": "cash"})
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body.splitlines(), ["date,description,mode,amount", "2026-01-01,tea,cash,3.00"])
+
+    def test_bad_filters_are_a_400(self):
+        response = self.client.get(reverse("expenses:export_expenses_csv"), {"min_amount": "NaN"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExpenseEtagTests(ExpenseApiTestCase):
+    def get(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(reverse("expenses:api_list"), {"limit": 10}, headers=headers)
+
+    def test_unchanged_ledger_is_a_304(self):
+        self.add(date(2026, 1, 1), "10.00")
+        etag = self.get()["ETag"]
+        self.assertTrue(etag)
+        self.assertEqual(self.get(etag).status_code, 304)
+
+    def test_every_kind_of_write_changes_the_etag(self):
+        row = self.add(date(2026, 1, 1), "10.00")
+        writes = [
+            lambda: self.add(date(2026, 1, 2), "5.00"),
+            # a batch edit whose rollup deltas cancel out still changes the rows
+            lambda: self.batch([{"op": "update", "id": row.id, "description": "coffee"}]),
+            lambda: self.batch([{"op": "delete", "id": row.id}]),
+        ]
+        etag = self.get()["ETag"]
+        for write in writes:
+            write()
+            response = self.get(etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+            etag = response["ETag"]
+
+    def test_other_users_writes_keep_the_etag(self):
+        etag = self.get()["ETag"]
+        other = User.objects.create_user("other", password="pw")
+        Expense.objects.create(user=other, date=date(2026, 1, 1), description="x", mode="cash", amount=1)
+        self.assertEqual(self.get(etag).status_code, 304)
+
+
+class ExpenseBatchTests(ExpenseApiTestCase):
+    def rollup(self, month, mode):
+        row = LedgerRollup.objects.filter(user=self.user, month=month, mode=mode, type="expense").first()
+        return (row.total, row.count) if row else None
+
+    def test_add_update_delete_in_one_batch(self):
+        keep = self.add(date(2026, 1, 5), "100.00")
+        gone = self.add(date(2026, 1, 6), "40.00")
+        response = self.batch([
+            {"op": "add", "date": "2026-01-07", "description": "milk", "mode": "cash", "amount": "12.50"},
+            {"op": "update", "id": keep.id, "amount": "90.00", "mode": "sbi"},
+            {"op": "delete", "id": gone.id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["success"] * 3)
+
+        added = Expense.objects.get(id=results[0]["id"])
+        self.assertEqual((added.description, added.amount), ("milk", Decimal("12.50")))
+        keep.refresh_from_db()
+        self.assertEqual((keep.amount, keep.mode), (Decimal("90.00"), "sbi"))
+        self.assertFalse(Expense.objects.filter(id=gone.id).exists())
+        # bulk writes keep the rollups in step too
+        self.assertEqual(self.rollup(date(2026, 1, 1), "cash"), (Decimal("12.50"), 1))
+        self.assertEqual(self.rollup(date(2026, 1, 1), "sbi"), (Decimal("90.00"), 1))
+
+    def test_one_bad_item_writes_nothing(self):
+        row = self.add(date(2026, 1, 5), "100.00")
+        other = User.objects.create_user("other", password="pw")
+        foreign = Expense.objects.create(user=other, date=date(2026, 1, 1), description="x", mode="cash", amount=1)
+        response = self.batch([
+            {"op": "add", "date": "2026-01-07", "description": "milk", "mode": "cash", "amount": "12.50"},
+            {"op": "update", "id": row.id, "amount": "NaN"},
+            {"op": "delete", "id": foreign.id},
+            {"op": "add", "date": "2026-01-07", "description": "", "mode": "cash", "amount": "1"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        statuses = [r["status"] for r in response.json()["results"]]
+        self.assertEqual(statuses, ["success", "error", "error", "error"])
+        self.assertEqual(list(Expense.objects.filter(user=self.user).values_list("id", flat=True)), [row.id])
+        self.assertTrue(Expense.objects.filter(id=foreign.id).exists())
 
-# Create your tests here.
+    def test_rejects_malformed_payloads(self):
+        for operations in ([], {"op": "add"}, [{"op": "add"}] * 1000):
+            with self.subTest(operations=str(operations)[:30]):
+                self.assertEqual(self.batch(operations).status_code, 400)
@@ -2,18 +2,31 @@ from django.shortcuts import render
 
 # Create your views here.
 import json
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.contrib.auth.decorators import login_required
 from .models import Expense
 from django.views.decorators.http import require_http_methods
 import csv
 from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from openpyxl import Workbook
 from reportlab.pdfgen import canvas
 from django.utils.dateparse import parse_date
 from decimal import Decimal, InvalidOperation
 from django.utils.timezone import now
+from django.db import transaction
+from django.db.models import Sum
+from accounts.pagination import akeyset_page, filter_ledger
+from accounts.exports import ledger_csv_response
+from accounts.jobs import enqueue_export, job_payload
+from accounts.reports import report_spec, report_xlsx_response
+from accounts.batch import apply_ledger_batch
+from accounts.writer import aledger_write, ledger_write
+from accounts.sync import ledger_changes, sync_cursor
+from accounts.ledger_cache import ledger_etag
+from accounts.serialization import FastJsonResponse, ledger_payload, ledger_rows, ledger_values, row_key
+from asgiref.sync import sync_to_async
 
 
 @login_required
@@ -21,19 +34,54 @@ def expenses_page(request):
     # Render page (template will fetch list via AJAX)
     return render(request, 'expenses/expenses.html')
 
+def _allowed_modes():
+    return [m[0] for m in Expense.MODE_CHOICES]
+
+@login_required
+@ledger_etag()
+async def api_list_expenses(request):
+    user = await request.auser()
+    # taken before the read so nothing committed meanwhile is missed by the next sync
+    since = sync_cursor()
+    try:
+        qs = filter_ledger(Expense.objects.filter(user=user), request.GET, _allowed_modes())
+        rows, next_cursor = await akeyset_page(ledger_values(qs), request.GET, key=row_key)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    # ?format=columns sends {"columns": {...}} instead of "results"
+    data = ledger_payload(rows, request.GET, amount='str')
+    data['next_cursor'] = next_cursor
+    data['since'] = since
+    # total of the filtered set is only needed once, with the first page
+    if not request.GET.get('cursor'):
+        data['total'] = str((await qs.aaggregate(total=Sum('amount')))['total'] or 0)
+    return FastJsonResponse(data)
+
 @login_required
-def api_list_expenses(request):
-    expenses = Expense.objects.filter(user=request.user).order_by('-date', '-created_at')
-    data = [e.as_dict() for e in expenses]
-    return JsonResponse(data, safe=False)
+async def api_sync_expenses(request):
+    # rows added/edited/deleted since ?since=, same filters as api/list/
+    user = await request.auser()
+    try:
+        changes = await sync_to_async(ledger_changes)(Expense, 'expense', user, request.GET, _allowed_modes())
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    if 'changed' in changes:
+        changes['changed'] = ledger_rows(changes['changed'], amount='str')
+    if request.GET.get('total') == '1' and not changes.get('reset'):
+        qs = filter_ledger(Expense.objects.filter(user=user), request.GET, _allowed_modes())
+        changes['total'] = str((await qs.aaggregate(total=Sum('amount')))['total'] or 0)
+    return FastJsonResponse(changes)
 
 @login_required
 @require_http_methods(["POST"])
-def api_add_expense(request):
+async def api_add_expense(request):
+    user = await request.auser()
     try:
         payload = json.loads(request.body)
-        e = Expense.objects.create(
-            user=request.user,
+        # atomic: the row and its rollup (post_save) commit or roll back together
+        e = await aledger_write(
+            transaction.atomic(Expense.objects.create),
+            user=user,
             date=payload.get('date'),
             description=payload.get('description'),
             mode=payload.get('mode'),
@@ -45,32 +93,47 @@ def api_add_expense(request):
 
 @login_required
 @require_http_methods(["POST"])
-def api_update_expense(request):
+async def api_update_expense(request):
+    user = await request.auser()
     try:
         payload = json.loads(request.body)
         eid = payload.get('id')
-        e = get_object_or_404(Expense, id=eid, user=request.user)
+        e = await aget_object_or_404(Expense, id=eid, user=user)
         e.date = payload.get('date')
         e.description = payload.get('description')
         e.mode = payload.get('mode')
         e.amount = payload.get('amount')
-        e.save()
+        await aledger_write(transaction.atomic(e.save))
         return JsonResponse({'status': 'success'})
     except Exception as exc:
         return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
 
 @login_required
 @require_http_methods(["POST"])
-def api_delete_expense(request):
+async def api_delete_expense(request):
+    user = await request.auser()
     try:
         payload = json.loads(request.body)
         eid = payload.get('id')
-        e = get_object_or_404(Expense, id=eid, user=request.user)
-        e.delete()
+        e = await aget_object_or_404(Expense, id=eid, user=user)
+        await aledger_write(transaction.atomic(e.delete))
         return JsonResponse({'status': 'success'})
     except Exception as exc:
         return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
 
+@login_required
+@require_http_methods(["POST"])
+def api_batch_expenses(request):
+    # {"operations": [{"op": "add"|"update"|"delete", ...}, ...]} applied in one transaction
+    try:
+        payload = json.loads(request.body)
+        ok, results = ledger_write(apply_ledger_batch, Expense, 'expense', request.user, payload.get('operations'), _allowed_modes())
+    except (ValueError, AttributeError) as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    if not ok:
+        return JsonResponse({'status': 'error', 'message': 'Invalid operations', 'results': results}, status=400)
+    return JsonResponse({'status': 'success', 'results': results})
+
 def api_add(request):
     if request.method == "POST":
         data = json.loads(request.body)
@@ -87,85 +150,34 @@ def api_add(request):
 # ---------- Excel Export ----------
 @login_required
 def export_expenses_excel(request):
-    from openpyxl import Workbook
-    from openpyxl.utils import get_column_letter
-
-    qs = Expense.objects.filter(user=request.user).order_by("date")
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Expenses"
-
-    headers = ["Date", "Description", "Mode", "Amount (₹)"]
-    ws.append(headers)
-
-    total = 0
-    for e in qs:
-        ws.append([e.date.strftime("%d-%b-%Y"), e.description, e.mode, float(e.amount)])
-        total += float(e.amount)
-
-    # Total row
-    ws.append(["", "", "Total", total])
-
-    # Auto column width
-    for col_idx, _ in enumerate(headers, start=1):
-        max_len = 0
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=col_idx, max_col=col_idx):
-            cell_val = row[0].value
-            max_len = max(max_len, len(str(cell_val)) if cell_val else 0)
-        ws.column_dimensions[get_column_letter(col_idx)].width = max_len + 2
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    filename = f"expenses_{now().date().isoformat()}.xlsx"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    # ?date_from=&date_to=&period=&mode= narrow it; no filters exports the full history
+    try:
+        spec = report_spec(request.GET, request.user, today=now().date(), type_="expense")
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    return report_xlsx_response(spec)
 
 
 # ---------- PDF Export ----------
 @login_required
+@require_http_methods(["POST"])
 def export_expenses_pdf(request):
-    from reportlab.lib.pagesizes import A4, inch
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-
-    qs = Expense.objects.filter(user=request.user).order_by("date")
-
-    # response + doc
-    response = HttpResponse(content_type="application/pdf")
-    filename = f"expenses_{now().date().isoformat()}.pdf"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4, leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    story.append(Paragraph("Expenses Report", styles["Title"]))
-    story.append(Spacer(1, 0.2 * inch))
-
-    data = [["Date", "Description", "Mode", "Amount (₹)"]]
-    total = 0
-    for e in qs:
-        data.append([e.date.strftime("%d-%b-%Y"), e.description, e.mode, f"{float(e.amount):.2f}"])
-        total += float(e.amount)
-
-    # Total row
-    data.append(["", "", "Total", f"{total:.2f}"])
-
-    table = Table(data, colWidths=[1.3*inch, 3.2*inch, 1.2*inch, 1.3*inch])
-    table.setStyle(TableStyle([
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-        ("ALIGN", (3,1), (3,-1), "RIGHT"),
-        ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
-        ("ROWBACKGROUNDS", (0,1), (-1,-2), [colors.whitesmoke, colors.beige]),
-        ("FONTNAME", (0,-1), (-1,-1), "Helvetica-Bold"),
-    ]))
-
-    story.append(table)
-    doc.build(story)
-    return response
\ No newline at end of file
+    try:
+        spec = report_spec(request.GET, request.user, today=now().date(), type_="expense")
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    # rendered by the export worker; the page polls the job status
+    job = enqueue_export(request.user, "expense_pdf", spec)
+    return JsonResponse(job_payload(job), status=202)
+
+
+# ---------- CSV Export ----------
+@login_required
+def export_expenses_csv(request):
+    try:
+        qs = filter_ledger(Expense.objects.filter(user=request.user), request.GET, _allowed_modes())
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    filename = f"expenses_{now().date().isoformat()}.csv"
+    return ledger_csv_response(qs.order_by("date", "id"), filename, request.GET.get("total") == "1",
+                               asynchronous=isinstance(request, ASGIRequest))
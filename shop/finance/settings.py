@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +55,14 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'finance.urls'
 
+# ProfileBackend joins the profile into the per-request user query. Sessions
+# remember the backend that logged them in, so ModelBackend stays listed for
+# the ones opened before ProfileBackend; new logins go through ProfileBackend.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.ProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -82,9 +91,44 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # keep connections open between requests (checked before reuse)
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # seconds a writer waits for the lock before "database is locked"
+            'timeout': 20,
+            # take the write lock at BEGIN, so a transaction never fails upgrading a read lock
+            'transaction_mode': 'IMMEDIATE',
+            # WAL lets readers run alongside the single writer; run on every new connection
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
+# Route ledger writes through one writer thread per process (accounts/writer.py)
+# so API calls queue up instead of contending for the SQLite write lock.
+SQLITE_WRITE_QUEUE = False
+
+# Request instrumentation (accounts.middleware.RequestTimingMiddleware)
+SERVER_TIMING_HEADERS = DEBUG
+SLOW_REQUEST_MS = 500
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # one JSON object per slow request
+        'shop.slow_requests': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -142,6 +186,16 @@ TEMPLATES[0]['DIRS'] = [BASE_DIR / 'templates']
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# `manage.py collectstatic` writes minified, content-hashed copies (css/expenses.3f2a9c.css)
+# plus .gz/.br versions into STATIC_ROOT; {% static %} resolves through its manifest. With
+# DEBUG off, /static/ is served by accounts.views.static_asset (or a web server in front)
+# with year-long immutable caching for the hashed names.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "accounts.storage.CompressedManifestStaticFilesStorage"},
+}
+
 # auth redirects
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard:dashboard'
@@ -150,6 +204,36 @@ LOGIN_REDIRECT_URL = 'dashboard:dashboard'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Background exports (see `manage.py run_export_worker`)
+EXPORT_WORKERS = 2
+EXPORT_JOB_TTL_HOURS = 24
+
+# Delta sync (see accounts/sync.py): deletions are remembered this long; older
+# sync cursors get {"reset": true} and reload their page. `manage.py
+# purge_tombstones` deletes the expired ones; run it daily along with
+# `manage.py snapshot_balances`.
+SYNC_TOMBSTONE_DAYS = 30
+
+# Month-end closing (see `manage.py close_period`): edits dated in a closed month
+# are either booked as PeriodAdjustment rows ("adjust") or rejected ("block").
+CLOSED_PERIOD_POLICY = "adjust"
+
+# Dashboard context cache (see accounts/ledger_cache.py). Entries are keyed by
+# the ledger version stored in the database, so a per-process LocMemCache never
+# serves data older than the last committed write; LocMemCache evicts
+# least-recently-used entries once MAX_ENTRIES is reached.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "dashboard": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "dashboard",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 1000, "CULL_FREQUENCY": 10},
+    },
+}
+
 # settings.py
 from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -15,10 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.shortcuts import redirect
 from django.conf import settings
 from django.conf.urls.static import static
+from accounts.views import static_asset
 
 
 urlpatterns = [
@@ -35,5 +36,8 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+else:
+    # collected static files; runserver serves the unhashed sources itself while DEBUG is on
+    urlpatterns += [re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), static_asset)]
 
 
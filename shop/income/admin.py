@@ -1,8 +1,10 @@
 from django.contrib import admin
+from accounts.search import FullTextSearchMixin
 from .models import Income
 
 @admin.register(Income)
-class IncomeAdmin(admin.ModelAdmin):
+class IncomeAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = 'income'
     list_display = ('id','user', 'date', 'description', 'mode', 'amount')
     list_filter = ('mode','date')
     search_fields = ('description', 'user__username')
@@ -20,6 +20,19 @@ class Income(models.Model):
 
     # add this:
     created_at = models.DateTimeField(auto_now_add=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # per-user lists, keyset pages and "recent" widgets: WHERE user ORDER BY date, id
+            models.Index(fields=['user', 'date', 'id'], name='income_user_date_id'),
+            # covering index for per-user date-range totals by mode
+            models.Index(fields=['user', 'date', 'mode', 'amount'], name='income_user_date_cover'),
+            # owner views that order the whole table by date
+            models.Index(fields=['date', 'id'], name='income_date_id'),
+            # delta sync: WHERE user AND updated_at > since
+            models.Index(fields=['user', 'updated_at'], name='income_user_updated'),
+        ]
 
     def __str__(self):
         return f"{self.user} — {self.amount} on {self.date}"
\ No newline at end of file
@@ -1,3 +1,99 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import LedgerTombstone
+from accounts.sync import SYNC_MAX_CHANGES, purge_tombstones
+
+from .models import Income
+
+
+class IncomeApiTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("staff", password="pw")
+        self.client.force_login(self.user)
+
+    def add(self, day=date(2026, 1, 1), amount="10.00", mode="cash", user=None):
+        return Income.objects.create(user=user or self.user, date=day, description="sale", mode=mode,
+                                     amount=Decimal(amount))
+
+
+class IncomeSyncTests(IncomeApiTestCase):
+    def sync(self, since, **params):
+        return self.client.get(reverse("income_api_sync"), {"since": since, **params})
+
+    def test_changes_since_the_list_cursor(self):
+        edited, deleted = self.add(), self.add()
+        since = self.client.get(reverse("income_api_list")).json()["since"]
+
+        added = self.add(amount="7.00")
+        edited.amount = Decimal("12.00")
+        edited.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        self.add(user=User.objects.create_user("other", password="pw"))
+
+        data = self.sync(since, total=1).json()
+        changed = {row["id"]: row["amount"] for row in data["changed"]}
+        self.assertEqual(changed.get(added.id), 7.0)
+        self.assertEqual(changed.get(edited.id), 12.0)
+        self.assertNotIn(deleted_id, changed)
+        self.assertEqual(data["removed"], [deleted_id])
+        # the income API sends amounts as numbers
+        self.assertEqual(data["total"], 19.0)
+        self.assertFalse(data.get("reset"))
+
+    def test_rows_leaving_the_filter_come_back_as_removed(self):
+        row = self.add(mode="cash")
+        since = self.client.get(reverse("income_api_list"), {"mode": "cash"}).json()["since"]
+        row.mode = "sbi"
+        row.save()
+        data = self.sync(since, mode="cash").json()
+        self.assertEqual(data["changed"], [])
+        self.assertEqual(data["removed"], [row.id])
+
+    def test_old_or_overflowing_cursors_reset(self):
+        old = (timezone.now() - timedelta(days=365)).isoformat()
+        self.assertTrue(self.sync(old).json()["reset"])
+
+        since = self.client.get(reverse("income_api_list")).json()["since"]
+        Income.objects.bulk_create([
+            Income(user=self.user, date=date(2026, 1, 1), description="bulk", mode="cash", amount=1)
+            for _ in range(SYNC_MAX_CHANGES + 1)
+        ])
+        data = self.sync(since).json()
+        self.assertTrue(data["reset"])
+        self.assertNotIn("changed", data)
+
+    def test_bad_cursor_is_a_400(self):
+        for since in ("", "yesterday", "2026-01-01T00:00:00"):  # naive timestamps are ambiguous
+            with self.subTest(since=since):
+                self.assertEqual(self.sync(since).status_code, 400)
+
+    def test_purge_drops_only_expired_tombstones(self):
+        self.add().delete()
+        self.add().delete()
+        LedgerTombstone.objects.filter(pk=LedgerTombstone.objects.first().pk).update(
+            deleted_at=timezone.now() - timedelta(days=365))
+        self.assertEqual(purge_tombstones(), 1)
+        self.assertEqual(LedgerTombstone.objects.count(), 1)
+
 
-# Create your tests here.
+class IncomeCsvExportTests(IncomeApiTestCase):
+    def test_csv_export_streams_the_filtered_rows(self):
+        self.add(day=date(2026, 1, 2), amount="5.00")
+        self.add(day=date(2026, 1, 1), amount="2.50", mode="sbi")
+        self.add(day=date(2026, 1, 3), amount="1.00", user=User.objects.create_user("other", password="pw"))
+        response = self.client.get(reverse("export_income_csv"), {"total": 1})
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [
+            "date,description,mode,amount",
+            "2026-01-01,sale,sbi,2.50",
+            "2026-01-02,sale,cash,5.00",
+            ",,Total,7.50",
+        ])
@@ -2,15 +2,28 @@ import json
 from datetime import date
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponseBadRequest
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
 from .models import Income, MODE_CHOICES
 import csv
 from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from openpyxl import Workbook
 from reportlab.pdfgen import canvas
 from django.utils.dateparse import parse_date
 from decimal import Decimal, InvalidOperation
 from django.utils.timezone import now
+from django.db import transaction
+from django.db.models import Sum
+from accounts.pagination import akeyset_page, filter_ledger
+from accounts.exports import ledger_csv_response
+from accounts.jobs import enqueue_export, job_payload
+from accounts.reports import report_spec, report_xlsx_response
+from accounts.batch import apply_ledger_batch
+from accounts.writer import aledger_write, ledger_write
+from accounts.sync import ledger_changes, sync_cursor
+from accounts.ledger_cache import ledger_etag
+from accounts.serialization import FastJsonResponse, ledger_payload, ledger_rows, ledger_values, row_key
+from asgiref.sync import sync_to_async
 
 
 
@@ -23,27 +36,51 @@ def income_list(request):
     return render(request, 'income/income_list.html', {'modes': MODE_CHOICES})
 
 @login_required
-def api_list(request):
+@ledger_etag()
+async def api_list(request):
     if request.method != 'GET':
         return HttpResponseBadRequest('GET only')
-    qs = Income.objects.filter(user=request.user).order_by('-date', '-id')
-    data = [
-        {
-            'id': obj.id,
-            'date': obj.date.isoformat(),
-            'description': obj.description,
-            'mode': obj.mode,
-            'amount': float(obj.amount),
-        }
-        for obj in qs
-    ]
-    return JsonResponse(data, safe=False)
+    user = await request.auser()
+    # taken before the read so nothing committed meanwhile is missed by the next sync
+    since = sync_cursor()
+    try:
+        qs = filter_ledger(Income.objects.filter(user=user), request.GET, _allowed_modes())
+        rows, next_cursor = await akeyset_page(ledger_values(qs), request.GET, key=row_key)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    # income amounts go out as numbers; ?format=columns sends {"columns": {...}}
+    data = ledger_payload(rows, request.GET, amount='float')
+    data['next_cursor'] = next_cursor
+    data['since'] = since
+    # total of the filtered set is only needed once, with the first page
+    if not request.GET.get('cursor'):
+        data['total'] = float((await qs.aaggregate(total=Sum('amount')))['total'] or 0)
+    return FastJsonResponse(data)
+
+
+@login_required
+async def api_sync(request):
+    # rows added/edited/deleted since ?since=, same filters as api/list/
+    if request.method != 'GET':
+        return HttpResponseBadRequest('GET only')
+    user = await request.auser()
+    try:
+        changes = await sync_to_async(ledger_changes)(Income, 'income', user, request.GET, _allowed_modes())
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    if 'changed' in changes:
+        changes['changed'] = ledger_rows(changes['changed'], amount='float')
+    if request.GET.get('total') == '1' and not changes.get('reset'):
+        qs = filter_ledger(Income.objects.filter(user=user), request.GET, _allowed_modes())
+        changes['total'] = float((await qs.aaggregate(total=Sum('amount')))['total'] or 0)
+    return FastJsonResponse(changes)
 
 
 @login_required
-def api_add(request):
+async def api_add(request):
     if request.method != "POST":
         return HttpResponseBadRequest("POST only")
+    user = await request.auser()
     try:
         payload = json.loads(request.body.decode('utf-8') or "{}")
         date_str = payload.get('date')
@@ -63,9 +100,10 @@ def api_add(request):
         except InvalidOperation:
             return JsonResponse({'status': 'error', 'message': 'Invalid amount'}, status=400)
 
-        # create model instance
-        obj = Income.objects.create(
-            user=request.user,
+        # create model instance; atomic so its rollup (post_save) commits with it
+        obj = await aledger_write(
+            transaction.atomic(Income.objects.create),
+            user=user,
             date=d,
             description=description,
             mode=mode,
@@ -79,15 +117,16 @@ def api_add(request):
 
 
 @login_required
-def api_update(request):
+async def api_update(request):
     if request.method != 'POST':
         return HttpResponseBadRequest('POST only')
+    user = await request.auser()
     try:
         payload = json.loads(request.body.decode('utf-8'))
         pk = payload.get('id')
         if not pk:
             return JsonResponse({'status': 'error', 'message': 'Missing id'}, status=400)
-        obj = get_object_or_404(Income, pk=pk, user=request.user)
+        obj = await aget_object_or_404(Income, pk=pk, user=user)
 
         if 'date' in payload and payload['date']:
             obj.date = date.fromisoformat(payload['date'])
@@ -99,100 +138,72 @@ def api_update(request):
             obj.mode = payload['mode']
         if 'amount' in payload and payload['amount'] is not None:
             obj.amount = payload['amount']
-        obj.save()
+        await aledger_write(transaction.atomic(obj.save))
 
         return JsonResponse({'status': 'success'})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
 @login_required
-def api_delete(request):
+async def api_delete(request):
     if request.method != 'POST':
         return HttpResponseBadRequest('POST only')
+    user = await request.auser()
     try:
         payload = json.loads(request.body.decode('utf-8'))
         pk = payload.get('id')
-        obj = get_object_or_404(Income, pk=pk, user=request.user)
-        obj.delete()
+        obj = await aget_object_or_404(Income, pk=pk, user=user)
+        await aledger_write(transaction.atomic(obj.delete))
         return JsonResponse({'status': 'success'})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
+@login_required
+def api_batch(request):
+    if request.method != 'POST':
+        return HttpResponseBadRequest('POST only')
+    # {"operations": [{"op": "add"|"update"|"delete", ...}, ...]} applied in one transaction
+    try:
+        payload = json.loads(request.body.decode('utf-8') or "{}")
+        ok, results = ledger_write(apply_ledger_batch, Income, 'income', request.user, payload.get('operations'), _allowed_modes())
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    if not ok:
+        return JsonResponse({'status': 'error', 'message': 'Invalid operations', 'results': results}, status=400)
+    return JsonResponse({'status': 'success', 'results': results})
+
 # ---------- Excel ----------
 @login_required
 def export_income_excel(request):
-    from openpyxl import Workbook
-    from openpyxl.utils import get_column_letter
-
-    qs = Income.objects.filter(user=request.user).order_by("date")
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Income"
-
-    headers = ["Date", "Description", "Mode", "Amount (₹)"]
-    ws.append(headers)
-
-    total = 0
-    for i in qs:
-        ws.append([i.date.strftime("%d-%b-%Y"), i.description, i.mode, float(i.amount)])
-        total += float(i.amount)
-
-    ws.append(["", "", "Total", total])
-
-    # simple auto width
-    for col_idx in range(1, len(headers) + 1):
-        max_len = 0
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=col_idx, max_col=col_idx):
-            v = row[0].value
-            max_len = max(max_len, len(str(v)) if v else 0)
-        ws.column_dimensions[get_column_letter(col_idx)].width = max_len + 2
-
-    resp = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    resp["Content-Disposition"] = f'attachment; filename="income_{now().date().isoformat()}.xlsx"'
-    wb.save(resp)
-    return resp
+    # ?date_from=&date_to=&period=&mode= narrow it; no filters exports the full history
+    try:
+        spec = report_spec(request.GET, request.user, today=now().date(), type_="income")
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return report_xlsx_response(spec)
 
 
 # ---------- PDF ----------
 @login_required
 def export_income_pdf(request):
-    from reportlab.lib.pagesizes import A4, inch
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-
-    qs = Income.objects.filter(user=request.user).order_by("date")
-
-    resp = HttpResponse(content_type="application/pdf")
-    resp["Content-Disposition"] = f'attachment; filename="income_{now().date().isoformat()}.pdf"'
-
-    doc = SimpleDocTemplate(resp, pagesize=A4, leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30)
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph("Income Report", styles["Title"]))
-    story.append(Spacer(1, 0.2 * inch))
-
-    data = [["Date", "Description", "Mode", "Amount (₹)"]]
-    total = 0
-    for i in qs:
-        data.append([i.date.strftime("%d-%b-%Y"), i.description, i.mode, f"{float(i.amount):.2f}"])
-        total += float(i.amount)
-    data.append(["", "", "Total", f"{total:.2f}"])
-
-    table = Table(data, colWidths=[1.3*inch, 3.2*inch, 1.2*inch, 1.3*inch])
-    table.setStyle(TableStyle([
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-        ("ALIGN", (3,1), (3,-1), "RIGHT"),
-        ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
-        ("ROWBACKGROUNDS", (0,1), (-1,-2), [colors.whitesmoke, colors.beige]),
-        ("FONTNAME", (0,-1), (-1,-1), "Helvetica-Bold"),
-    ]))
-
-    story.append(table)
-    doc.build(story)
-    return resp
\ No newline at end of file
+    if request.method != "POST":
+        return HttpResponseBadRequest("POST only")
+    try:
+        spec = report_spec(request.GET, request.user, today=now().date(), type_="income")
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    # rendered by the export worker; the page polls the job status
+    job = enqueue_export(request.user, "income_pdf", spec)
+    return JsonResponse(job_payload(job), status=202)
+
+
+# ---------- CSV ----------
+@login_required
+def export_income_csv(request):
+    try:
+        qs = filter_ledger(Income.objects.filter(user=request.user), request.GET, _allowed_modes())
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    filename = f"income_{now().date().isoformat()}.csv"
+    return ledger_csv_response(qs.order_by("date", "id"), filename, request.GET.get("total") == "1",
+                               asynchronous=isinstance(request, ASGIRequest))
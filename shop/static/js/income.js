@@ -0,0 +1,360 @@
+/* -----------------------------
+   Unified script: fetch, render,
+   search, pagination, add/edit/delete
+   ----------------------------- */
+
+// CSRF helper (same as your original)
+function getCookie(name) {
+  let cookieValue = null;
+  if (document.cookie && document.cookie !== '') {
+    const cookies = document.cookie.split(';');
+    for (let i = 0; i < cookies.length; i++) {
+      const cookie = cookies[i].trim();
+      if (cookie.substring(0, name.length + 1) === (name + '=')) {
+        cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+        break;
+      }
+    }
+  }
+  return cookieValue;
+}
+const csrftoken = getCookie('csrftoken');
+
+// API endpoints (ensure these names match your income/urls.py names)
+// (rendered into the data- attributes of this script's tag)
+const urls = document.currentScript.dataset;
+const API_LIST = urls.apiList;
+const API_ADD = urls.apiAdd;
+const API_UPDATE = urls.apiUpdate;
+const API_DELETE = urls.apiDelete;
+const API_SYNC = urls.apiSync;
+
+// DOM references
+const form = document.getElementById('incomeForm');
+const tableBody = document.getElementById('incomeTableBody');
+const totalDisplay = document.getElementById('totalIncome');
+const addBtn = document.getElementById('addBtn');
+const paginationContainer = document.getElementById('pagination');
+const searchInputEl = document.querySelector('#searchInput input');
+
+let editingId = null;
+let incomesData = [];      // rows of the current page only
+let currentPage = 1;
+let pageCursors = [null];  // cursor used to fetch each visited page
+let nextCursor = null;
+let filteredTotal = 0;
+let syncSince = null;      // change cursor from the last list/sync response
+const rowsPerPage = 5;
+
+// small utilities
+function formatDMY(isoDate) {
+  if (!isoDate) return '';
+  const d = new Date(isoDate);
+  if (isNaN(d)) return isoDate;
+  return d.toLocaleDateString('en-GB', { day: 'numeric', month: 'short', year: 'numeric' });
+}
+function escapeHtml(str) {
+  if (!str) return '';
+  return String(str)
+    .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;').replace(/'/g, '&#039;');
+}
+
+// build list URL for the current page (server does filtering + pagination)
+function listUrl() {
+  const params = new URLSearchParams({ limit: rowsPerPage });
+  const cursor = pageCursors[currentPage - 1];
+  if (cursor) params.set('cursor', cursor);
+  const query = (searchInputEl && searchInputEl.value) ? searchInputEl.value.trim() : '';
+  if (query) params.set('q', query);
+  return `${API_LIST}?${params}`;
+}
+
+// FETCH one page from server and render it
+async function fetchPage() {
+  try {
+    const res = await fetch(listUrl());
+    if (!res.ok) throw new Error('Failed to fetch list');
+    const out = await res.json();
+    incomesData = out.results;
+    nextCursor = out.next_cursor;
+    syncSince = out.since;
+    if (out.total !== undefined) filteredTotal = Number(out.total);
+    renderTable();
+  } catch (err) {
+    console.error('fetchPage error:', err);
+    tableBody.innerHTML = '<tr><td colspan="5">Error loading incomes.</td></tr>';
+    totalDisplay.textContent = 'Total: ₹0';
+  }
+}
+
+// reset to the first page (after search or writes)
+function fetchAndRender() {
+  currentPage = 1;
+  pageCursors = [null];
+  return fetchPage();
+}
+
+// (date, id) descending, the list API's order
+function rowKey(row) { return [row.date, Number(row.id)]; }
+function keyBefore(a, b) { return a[0] > b[0] || (a[0] === b[0] && a[1] > b[1]); }
+function cursorKey(cursor) {
+  const [d, id] = cursor.split('_');
+  return [d, Number(id)];
+}
+
+// after a write: patch the visible page from api/sync/ instead of reloading it
+async function syncPage() {
+  if (!syncSince) return fetchPage();
+  try {
+    const params = new URLSearchParams({ since: syncSince, total: 1 });
+    const query = (searchInputEl && searchInputEl.value) ? searchInputEl.value.trim() : '';
+    if (query) params.set('q', query);
+    const res = await fetch(`${API_SYNC}?${params}`);
+    if (!res.ok) throw new Error('Failed to sync');
+    const out = await res.json();
+    if (out.reset) return fetchPage();
+    syncSince = out.since;
+
+    const gone = new Set([...out.removed, ...out.changed.map(r => r.id)].map(Number));
+    const full = incomesData.length >= rowsPerPage;
+    const last = incomesData.length ? rowKey(incomesData[incomesData.length - 1]) : null;
+    const pageStart = pageCursors[currentPage - 1] ? cursorKey(pageCursors[currentPage - 1]) : null;
+    // a changed row belongs here if it sorts inside this page's (date, id) range
+    const inPage = (row) => {
+      const key = rowKey(row);
+      if (pageStart && !keyBefore(pageStart, key)) return false;
+      return !full || !last || !keyBefore(last, key);
+    };
+    const rows = incomesData.filter(r => !gone.has(Number(r.id)))
+      .concat(out.changed.filter(inPage));
+    rows.sort((a, b) => keyBefore(rowKey(a), rowKey(b)) ? -1 : 1);
+
+    if (rows.length > rowsPerPage) {
+      incomesData = rows.slice(0, rowsPerPage);
+      const edge = incomesData[incomesData.length - 1];
+      nextCursor = `${edge.date}_${edge.id}`;
+    } else if (rows.length < rowsPerPage && nextCursor) {
+      return fetchPage(); // rows left the page; pull the next ones up
+    } else {
+      incomesData = rows;
+    }
+    if (out.total !== undefined) filteredTotal = Number(out.total);
+    renderTable();
+  } catch (err) {
+    console.error('syncPage error:', err);
+    fetchPage();
+  }
+}
+
+// RENDER the current page
+function renderTable() {
+  tableBody.innerHTML = '';
+  if (incomesData.length === 0) {
+    tableBody.innerHTML = '<tr><td colspan="5">No incomes found.</td></tr>';
+  } else {
+    for (const item of incomesData) {
+      const tr = document.createElement('tr');
+
+      tr.innerHTML = `
+      <td>${formatDMY(item.date)}</td>
+      <td>${escapeHtml(item.description)}</td>
+      <td>${escapeHtml(item.mode)}</td>
+      <td>₹${Number(item.amount).toFixed(2)}</td>
+      <td class="actions"></td>
+    `;
+      // add action buttons (safe, no inline string escaping)
+      const actionsCell = tr.querySelector('.actions');
+
+      const editBtn = document.createElement('button');
+      editBtn.className = 'edit-btn';
+      editBtn.type = 'button';
+      editBtn.title = 'Edit';
+      editBtn.innerText = '✏️';
+      editBtn.addEventListener('click', () => startEdit(item.id, item.date, item.description, item.mode, item.amount));
+      actionsCell.appendChild(editBtn);
+
+      const delBtn = document.createElement('button');
+      delBtn.className = 'delete-btn';
+      delBtn.type = 'button';
+      delBtn.title = 'Delete';
+      delBtn.innerText = '🗑️';
+      delBtn.style.marginLeft = '8px';
+      delBtn.addEventListener('click', () => deleteIncome(item.id));
+      actionsCell.appendChild(delBtn);
+
+      tableBody.appendChild(tr);
+    }
+  }
+
+  totalDisplay.textContent = `Total: ₹${filteredTotal.toFixed(2)}`;
+  renderPagination();
+}
+
+// Render prev/next controls (keyset pages can only step one at a time)
+function renderPagination() {
+  if (!paginationContainer) return;
+  paginationContainer.innerHTML = ''; // clear
+
+  if (currentPage === 1 && !nextCursor) return; // no pagination needed
+
+  // Previous
+  const prev = document.createElement('button');
+  prev.type = 'button';
+  prev.disabled = (currentPage === 1);
+  prev.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg" height="24px" viewBox="0 -960 960 960" width="24px" fill="#e3e3e3"><path d="M440-240 200-480l240-240 56 56-183 184 183 184-56 56Zm264 0L464-480l240-240 56 56-183 184 183 184-56 56Z"/></svg>';
+  prev.addEventListener('click', () => changePage(currentPage - 1));
+  paginationContainer.appendChild(prev);
+
+  const pbtn = document.createElement('button');
+  pbtn.type = 'button';
+  pbtn.innerText = currentPage;
+  pbtn.style.background = 'white';
+  pbtn.style.color = 'red';
+  paginationContainer.appendChild(pbtn);
+
+  // Next
+  const next = document.createElement('button');
+  next.type = 'button';
+  next.disabled = !nextCursor;
+  next.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg" height="24px" viewBox="0 -960 960 960" width="24px" fill="#e3e3e3"><path d="M383-480 200-664l56-56 240 240-240 240-56-56 183-184Zm264 0L464-664l56-56 240 240-240 240-56-56 183-184Z"/></svg>';
+  next.addEventListener('click', () => changePage(currentPage + 1));
+  paginationContainer.appendChild(next);
+}
+
+function changePage(page) {
+  if (page < 1) return;
+  if (page > currentPage) {
+    if (!nextCursor) return;
+    pageCursors[page - 1] = nextCursor;
+  }
+  currentPage = page;
+  fetchPage();
+}
+
+// Start editing: fills form and sets editingId
+function startEdit(id, date, description, mode, amount) {
+  document.getElementById('date').value = date;
+  document.getElementById('description').value = description;
+  document.getElementById('mode').value = mode;
+  document.getElementById('amount').value = amount;
+  editingId = id;
+  addBtn.textContent = 'Update Income';
+  window.scrollTo({ top: 0, behavior: 'smooth' });
+}
+
+// delete request
+async function deleteIncome(id) {
+  if (!confirm('Delete this income?')) return;
+  try {
+    const res = await fetch(API_DELETE, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrftoken },
+      body: JSON.stringify({ id })
+    });
+    const out = await res.json();
+    if (out.status === 'success') {
+      syncPage();
+    } else {
+      alert('Delete failed: ' + (out.message || 'unknown'));
+    }
+  } catch (err) {
+    console.error('deleteIncome error:', err);
+    alert('Delete failed (network error).');
+  }
+}
+
+// form submit -> add or update
+form.addEventListener('submit', async (e) => {
+  e.preventDefault();
+  const payload = {
+    date: document.getElementById('date').value,
+    description: document.getElementById('description').value.trim(),
+    mode: document.getElementById('mode').value,
+    amount: parseFloat(document.getElementById('amount').value),
+  };
+
+  if (!payload.date || !payload.description || !payload.mode || isNaN(payload.amount)) {
+    alert('Please fill all fields correctly.');
+    return;
+  }
+
+  try {
+    if (editingId) {
+      payload.id = editingId;
+      const res = await fetch(API_UPDATE, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrftoken },
+        body: JSON.stringify(payload)
+      });
+      const out = await res.json();
+      if (out.status === 'success') {
+        editingId = null;
+        addBtn.textContent = 'Add Income';
+        form.reset();
+        syncPage();
+      } else {
+        alert('Update failed: ' + (out.message || 'unknown'));
+      }
+    } else {
+      const res = await fetch(API_ADD, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrftoken },
+        body: JSON.stringify(payload)
+      });
+      const out = await res.json();
+      if (out.status === 'success') {
+        form.reset();
+        await syncPage();
+      } else {
+        alert('Add failed: ' + (out.message || 'unknown'));
+      }
+    }
+  } catch (err) {
+    console.error('submit error:', err);
+    alert('Request failed (network/server error).');
+  }
+});
+
+// wire search -> server-side description filter (debounced)
+let searchTimer = null;
+if (searchInputEl) {
+  searchInputEl.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(fetchAndRender, 300);
+  });
+}
+
+// PDF export runs in the background: enqueue, poll the job, then download
+const pdfLink = document.getElementById('pdfExport');
+if (pdfLink) {
+  const pdfLabel = pdfLink.lastChild.textContent;
+  pdfLink.addEventListener('click', async (e) => {
+    e.preventDefault();
+    if (pdfLink.dataset.busy) return;
+    pdfLink.dataset.busy = '1';
+    try {
+      const res = await fetch(pdfLink.href, { method: 'POST', headers: { 'X-CSRFToken': csrftoken } });
+      let job = await res.json();
+      while (job.status === 'queued' || job.status === 'running') {
+        pdfLink.lastChild.textContent = `  PDF ${job.progress}%`;
+        await new Promise(r => setTimeout(r, 1000));
+        job = await (await fetch(job.status_url)).json();
+      }
+      if (job.status === 'done') {
+        window.location = job.download_url;
+      } else {
+        alert('PDF export failed: ' + (job.error || 'unknown'));
+      }
+    } catch (err) {
+      console.error('pdf export error:', err);
+      alert('PDF export failed (network/server error).');
+    } finally {
+      pdfLink.lastChild.textContent = pdfLabel;
+      delete pdfLink.dataset.busy;
+    }
+  });
+}
+
+// initial load
+window.addEventListener('DOMContentLoaded', fetchAndRender);